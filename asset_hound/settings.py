@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
 
     # dependencies
     'corsheaders',
@@ -187,7 +188,15 @@ REST_FRAMEWORK = {
 
 # Extra stuff
 GEOCODER_API_KEY = GEOCODIO_API_KEY
-
+# Geocoder backends (see assets/geocoders.py), tried in this order. Set this to ['stub']
+# to geocode from assets.geocoders.STUB_RESULTS (offline).
+GEOCODER_BACKENDS = ['local', 'geocodio', 'geomancer']
+LOCAL_GEOCODER_ADDRESS_FILE = None # Optional CSV file of address points (address, latitude, longitude)
+LOCAL_GEOCODER_MAX_AGE = 3600 # seconds before the local geocoder's index is rebuilt
+GEOCODE_CACHE_DAYS = 365 # How long geocoding results are reused (see assets/geocoding.py).
+GEOCODE_CACHE_NEGATIVE_DAYS = 30 # How long to remember that an address could not be geocoded.
+
+PUBLIC_BASE_URL = 'https://assets.wprdc.org' # Used to build absolute URLs outside of requests (see community_resources/payloads.py).
 
 CORS_ORIGIN_ALLOW_ALL = True
 
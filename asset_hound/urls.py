@@ -21,5 +21,6 @@ urlpatterns = [
     # api/<version>/<app>/<endpoints>
     path('edit/', include('assets.urls_edit')),
     path('api/dev/assets/', include('assets.urls')),
-    path('api/dev/resources/', include('community_resources.urls'))
+    path('api/dev/resources/', include('community_resources.urls')),
+    path('api/dev/geo/', include('geo.urls')),
 ]
@@ -10,7 +10,11 @@ from .models import (AssetType,
                      DataSource,
                      Asset,
                      RawAsset,
-                     Category)
+                     Category,
+                     AssetUpdateJob,
+                     AssetUpdateJobMessage,
+                     GeocodeCacheEntry,
+                     GeographyAssetSummary)
 
 
 @admin.register(AssetType)
@@ -142,3 +146,31 @@ class RawAssetAdmin(SimpleHistoryAdmin):
         'hard_to_count_population',
     )
     search_fields = ('name', 'street_address', 'city', 'zip_code')
+
+
+class AssetUpdateJobMessageInline(admin.TabularInline):
+    model = AssetUpdateJobMessage
+    extra = 0
+    readonly_fields = ('text',)
+
+
+@admin.register(AssetUpdateJob)
+class AssetUpdateJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'mode', 'using', 'status', 'processed_rows', 'total_rows', 'submitted_by', 'submitted_at', 'finished_at')
+    list_filter = ('status', 'mode', 'using')
+    readonly_fields = ('processed_rows', 'total_rows', 'submitted_at', 'finished_at')
+    inlines = [AssetUpdateJobMessageInline]
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('normalized_address', 'provider', 'latitude', 'longitude', 'succeeded', 'created')
+    list_filter = ('provider', 'succeeded')
+    search_fields = ('normalized_address',)
+
+
+@admin.register(GeographyAssetSummary)
+class GeographyAssetSummaryAdmin(admin.ModelAdmin):
+    list_display = ('geo_level', 'geo_key', 'geography', 'category', 'asset_type', 'count')
+    list_filter = ('geo_level', 'category')
+    search_fields = ('geo_key', 'geography__name')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AssetsConfig(AppConfig):
     name = 'assets'
+
+    def ready(self):
+        import assets.signals # This connects the signal handlers.
@@ -0,0 +1,53 @@
+"""The asset index is a materialized view with one row per displayable Asset (with the
+asset type, category and location fields already joined in). It backs the map points,
+so that the map can be drawn from a single indexed scan.
+
+It replaces extra/create_asset_index_table.sql, which hardcoded the category and asset
+type titles instead of reading them from the Category and AssetType tables."""
+from django.db import connection
+
+from assets.models import Asset, AssetType, Category, Location
+
+VIEW_NAME = 'assets_assetindex'
+
+
+def view_definition():
+    return f"""
+        SELECT a.id,
+               a.name,
+               t.name AS asset_type,
+               t.title AS asset_type_title,
+               c.name AS category,
+               c.title AS category_title,
+               a.sensitive,
+               l.id AS location_id,
+               l.street_address,
+               l.city,
+               l.state,
+               l.zip_code,
+               l.geom
+        FROM {Asset._meta.db_table} a
+        JOIN {Location._meta.db_table} l ON l.id = a.location_id
+        LEFT JOIN {AssetType._meta.db_table} t ON t.id = a.primary_asset_type_id
+        LEFT JOIN {Category._meta.db_table} c ON c.id = a.primary_category_id
+        WHERE a.do_not_display IS NOT TRUE
+          AND l.geom IS NOT NULL
+    """
+
+
+def create_asset_index(drop_first=False):
+    with connection.cursor() as cursor:
+        if drop_first:
+            cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {VIEW_NAME}")
+        cursor.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {VIEW_NAME} AS {view_definition()} WITH DATA")
+        # The unique index is what allows the view to be refreshed CONCURRENTLY (that is,
+        # without locking out readers).
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {VIEW_NAME}_id ON {VIEW_NAME} (id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_geom ON {VIEW_NAME} USING GIST (geom)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_category ON {VIEW_NAME} (category)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_asset_type ON {VIEW_NAME} (asset_type)")
+
+
+def refresh_asset_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}")
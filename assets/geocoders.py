@@ -0,0 +1,231 @@
+"""Geocoder backends.
+
+Each backend has a name (used in the GEOCODER_BACKENDS setting) and implements
+geocode(address) and geocode_many(addresses), returning (lat, lng, properties)
+tuples, with (None, None, None) meaning that the backend couldn't find the
+address. Errors (like timeouts) are raised rather than swallowed, so that the
+caller can fall back to the next backend without caching anything.
+
+Remote backends share a pooled requests.Session (so that repeated calls reuse
+connections) and use timeouts. Every backend keeps simple latency statistics
+(see stats())."""
+import csv, threading, time
+
+import requests
+from django.conf import settings
+
+from asset_hound.settings import GEOCODER_API_KEY
+from assets.models import Location
+from assets.utils import normalize_address, form_full_address_from_location
+
+BACKENDS = {}
+
+def register_backend(cls):
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+class RateLimiter:
+    """A token bucket: acquire() blocks until a token is available. Tokens are
+    added at rate per second, and up to burst of them can accumulate."""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeocoderBackend:
+    name = None
+    remote = True # Whether results are worth caching in the GeocodeCacheEntry table.
+    timeout = 10 # seconds
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.addresses = 0
+        self.hits = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+    def geocode_many(self, addresses):
+        return [self.geocode(address) for address in addresses]
+
+    def timed(self, method, addresses):
+        """Call method on addresses (a list), recording the latency and the outcome."""
+        start = time.perf_counter()
+        try:
+            results = method(addresses)
+        except Exception:
+            with self.lock:
+                self.calls += 1
+                self.errors += 1
+                self.seconds += time.perf_counter() - start
+            raise
+        with self.lock:
+            self.calls += 1
+            self.addresses += len(addresses)
+            self.hits += len([r for r in results if r[0] is not None])
+            self.seconds += time.perf_counter() - start
+        return results
+
+    def timed_geocode(self, address):
+        return self.timed(lambda addresses: [self.geocode(addresses[0])], [address])[0]
+
+    def stats(self):
+        return {'calls': self.calls,
+            'addresses': self.addresses,
+            'hits': self.hits,
+            'errors': self.errors,
+            'mean_latency_ms': round(1000 * self.seconds / self.calls, 3) if self.calls else None}
+
+
+_session = threading.local()
+
+def get_session():
+    """A requests.Session per thread (Sessions aren't guaranteed to be thread-safe),
+    so that connections to the geocoders get reused."""
+    if not hasattr(_session, 'session'):
+        _session.session = requests.Session()
+    return _session.session
+
+
+@register_backend
+class GeocodioBackend(GeocoderBackend):
+    name = 'geocodio'
+    url = 'https://api.geocod.io/v1.4/geocode'
+
+    def properties(self, result):
+        wanted_keys = ['accuracy', 'accuracy_type', 'address_components']
+        properties = dict((k, result[k]) for k in wanted_keys if k in result)
+        properties['geocoder'] = 'Geocodio'
+        return properties
+
+    def result(self, results):
+        if len(results) == 0:
+            return None, None, None
+        first_result = results[0]
+        return first_result['location']['lat'], first_result['location']['lng'], self.properties(first_result)
+
+    def geocode(self, address):
+        r = get_session().get(self.url, params={'q': address, 'api_key': GEOCODER_API_KEY}, timeout=self.timeout)
+        response_data = r.json()
+        if 'error' in response_data:
+            if r.status_code == 422: # Geocodio couldn't parse/find the address.
+                return None, None, None
+            raise RuntimeError(f"Geocodio response: {response_data['error']}")
+        return self.result(response_data['results'])
+
+    def geocode_many(self, addresses):
+        """Geocode the addresses with one batch request (which can hold up to 10,000 addresses)."""
+        r = get_session().post(self.url, params={'api_key': GEOCODER_API_KEY}, json=addresses, timeout=600)
+        r.raise_for_status()
+        return [self.result(item.get('response', {}).get('results', [])) for item in r.json()['results']]
+
+
+@register_backend
+class GeomancerBackend(GeocoderBackend):
+    name = 'geomancer'
+    url = 'https://tools.wprdc.org/geo/geocode'
+    limiter = RateLimiter(10) # This replaces a fixed 0.1-second sleep after each request.
+
+    def geocode(self, address):
+        self.limiter.acquire()
+        r = get_session().get(self.url, params={'addr': address}, timeout=self.timeout)
+        result = r.json()
+        if result['data']['status'] == "OK":
+            longitude, latitude = result['data']['geom']['coordinates']
+            return latitude, longitude, {'geocoder': 'Geomancer'}
+        print("Unable to geocode {}, failing with status code {}.".format(address, result['data']['status']))
+        return None, None, None
+
+
+@register_backend
+class LocalBackend(GeocoderBackend):
+    """Look addresses up in memory, in an index built from our own Locations (the ones
+    with geocoordinates that aren't flagged as iffy) and, optionally, from an
+    address-point CSV file (with address, latitude, and longitude columns) given
+    by the LOCAL_GEOCODER_ADDRESS_FILE setting. The index is rebuilt when it is
+    more than LOCAL_GEOCODER_MAX_AGE seconds old."""
+    name = 'local'
+    remote = False
+    index = None
+    built = None
+    build_lock = threading.Lock()
+
+    @classmethod
+    def build_index(cls):
+        index = {}
+        address_file = getattr(settings, 'LOCAL_GEOCODER_ADDRESS_FILE', None)
+        if address_file:
+            with open(address_file, 'r') as f:
+                for row in csv.DictReader(f):
+                    index[normalize_address(row['address'])] = (float(row['latitude']), float(row['longitude']))
+        locations = Location.objects.filter(latitude__isnull=False, longitude__isnull=False) \
+            .exclude(iffy_geocoding=True).exclude(street_address__isnull=True).exclude(street_address='') \
+            .only('street_address', 'city', 'municipality', 'state', 'zip_code', 'latitude', 'longitude')
+        for location in locations: # Our own Locations take precedence over the file.
+            index[normalize_address(form_full_address_from_location(location))] = (location.latitude, location.longitude)
+        return index
+
+    def get_index(self):
+        max_age = getattr(settings, 'LOCAL_GEOCODER_MAX_AGE', 3600)
+        with self.build_lock:
+            if LocalBackend.index is None or time.monotonic() - LocalBackend.built > max_age:
+                LocalBackend.index = self.build_index()
+                LocalBackend.built = time.monotonic()
+        return LocalBackend.index
+
+    def geocode(self, address):
+        result = self.get_index().get(normalize_address(address))
+        if result is None:
+            return None, None, None
+        latitude, longitude = result
+        return latitude, longitude, {'geocoder': 'local'}
+
+
+# For testing (or working offline), set GEOCODER_BACKENDS = ['stub'] and put
+# results here, keyed by normalized address.
+STUB_RESULTS = {} # normalized address -> (latitude, longitude)
+
+@register_backend
+class StubBackend(GeocoderBackend):
+    name = 'stub'
+    remote = False # (Its made-up results must never end up in the GeocodeCacheEntry table.)
+
+    def geocode(self, address):
+        result = STUB_RESULTS.get(normalize_address(address))
+        if result is None:
+            return None, None, None
+        latitude, longitude = result
+        return latitude, longitude, {'geocoder': 'stub'}
+
+
+_instances = {}
+
+def get_backends():
+    """Return the backend instances named by the GEOCODER_BACKENDS setting, in order."""
+    names = getattr(settings, 'GEOCODER_BACKENDS', ['local', 'geocodio', 'geomancer'])
+    for name in names:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+    return [_instances[name] for name in names]
+
+def backend_stats():
+    return {name: backend.stats() for name, backend in _instances.items()}
@@ -0,0 +1,160 @@
+"""Geocoding with a persistent cache and a chain of geocoder backends.
+
+Addresses are first looked up with the local backends (see assets/geocoders.py),
+which resolve addresses we already know without leaving the process. Then the
+GeocodeCacheEntry table is checked (keyed by normalized address), so that
+re-running regeocode_location, split_locations_in_file, or a reload makes no
+remote calls for addresses that have already been geocoded. Only then are the
+remote backends tried, in the order given by the GEOCODER_BACKENDS setting.
+
+Failures are cached too (for a shorter time), so that ungeocodable addresses
+aren't retried on every run. Errors (like timeouts) are not cached."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from assets.models import GeocodeCacheEntry
+from assets.geocoders import get_backends, RateLimiter
+from assets.utils import normalize_address
+
+def cached_results(normalized_addresses):
+    """Return the unexpired GeocodeCacheEntries for these addresses, keyed by
+    normalized address (using one query rather than one per address)."""
+    now = timezone.now()
+    positive_cutoff = now - timedelta(days=getattr(settings, 'GEOCODE_CACHE_DAYS', 365))
+    negative_cutoff = now - timedelta(days=getattr(settings, 'GEOCODE_CACHE_NEGATIVE_DAYS', 30))
+    entries = {}
+    for entry in GeocodeCacheEntry.objects.filter(normalized_address__in=list(normalized_addresses)):
+        if entry.created >= (positive_cutoff if entry.succeeded else negative_cutoff):
+            entries[entry.normalized_address] = entry
+    return entries
+
+def entry_to_result(entry):
+    properties = json.loads(entry.properties) if entry.properties else None
+    return entry.latitude, entry.longitude, properties
+
+def new_entry(normalized_address, provider_name, latitude, longitude, properties):
+    return GeocodeCacheEntry(normalized_address=normalized_address,
+        provider=provider_name,
+        latitude=latitude,
+        longitude=longitude,
+        properties=json.dumps(properties) if properties is not None else None,
+        succeeded=latitude is not None)
+
+def save_entries(entries):
+    # Replace any expired entries for these addresses.
+    GeocodeCacheEntry.objects.filter(normalized_address__in=[e.normalized_address for e in entries]).delete()
+    GeocodeCacheEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+def geocode_address_with_cache(address, use_cache=True, use_local=True):
+    """Geocode address, checking the local backends (unless use_local is False)
+    and then the cache (unless use_cache is False) before trying the remote
+    backends, and storing the remote result (or the failure) in the cache.
+
+    Re-geocoding a Location should use use_local=False, since the local index
+    would just hand the Location back its own current coordinates.
+
+    Returns ({float}, {float}, properties) (lat, lng, properties) tuple."""
+    normalized_address = normalize_address(address)
+    if normalized_address == '':
+        return None, None, None
+    backends = get_backends()
+    for backend in [b for b in backends if not b.remote and use_local]:
+        latitude, longitude, properties = backend.timed_geocode(address)
+        if latitude is not None:
+            return latitude, longitude, properties
+
+    if use_cache:
+        entry = cached_results([normalized_address]).get(normalized_address)
+        if entry is not None:
+            return entry_to_result(entry)
+
+    any_errors = False
+    for backend in [b for b in backends if b.remote]:
+        try:
+            latitude, longitude, properties = backend.timed_geocode(address)
+        except Exception as e:
+            print(f"Unable to geocode {address} with {backend.name} ({type(e).__name__}: {e}).")
+            any_errors = True
+            continue
+        if latitude is not None:
+            save_entries([new_entry(normalized_address, backend.name, latitude, longitude, properties)])
+            return latitude, longitude, properties
+    if not any_errors: # Only remember the failure if every backend actually answered.
+        save_entries([new_entry(normalized_address, 'none', None, None, None)])
+    return None, None, None
+
+def geocode_batch(addresses, batch_size=1000, workers=4, rate=1.0, use_cache=True, use_local=True):
+    """Geocode a list of addresses, returning a dict mapping each address to a
+    (lat, lng, properties) tuple.
+
+    Addresses that the local backends know or that are in the cache aren't sent
+    anywhere. The rest are deduplicated (by normalized address) and sent to each
+    remote backend in turn (each getting the ones the previous backends couldn't
+    find), in batches of batch_size, using up to workers concurrent requests and
+    no more than rate requests per second. The new results are added to the cache
+    in bulk. A batch that fails (for instance, with a timeout) is passed on to the
+    next backend, and its addresses are not cached as failures. use_cache and
+    use_local work as in geocode_address_with_cache."""
+    normalized = {address: normalize_address(address) for address in addresses}
+    results = {}
+    to_geocode = {} # normalized address -> the address to send
+    for address, normalized_address in normalized.items():
+        if normalized_address == '':
+            results[address] = (None, None, None)
+        else:
+            to_geocode.setdefault(normalized_address, address)
+
+    backends = get_backends()
+    found = {} # normalized address -> (lat, lng, properties)
+    for backend in [b for b in backends if not b.remote and use_local]:
+        queries = [(n, a) for n, a in to_geocode.items() if n not in found]
+        for (normalized_address, _), result in zip(queries, backend.timed(backend.geocode_many, [a for _, a in queries])):
+            if result[0] is not None:
+                found[normalized_address] = result
+
+    if use_cache:
+        for normalized_address, entry in cached_results([n for n in to_geocode if n not in found]).items():
+            found[normalized_address] = entry_to_result(entry)
+
+    errored = set()
+    new_entries = []
+    for backend in [b for b in backends if b.remote]:
+        queries = [(n, a) for n, a in to_geocode.items() if n not in found]
+        if len(queries) == 0:
+            break
+        limiter = RateLimiter(rate, burst=workers)
+        batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+
+        def geocode_one_batch(batch):
+            limiter.acquire()
+            try:
+                return batch, backend.timed(backend.geocode_many, [address for _, address in batch])
+            except Exception as e:
+                print(f"Unable to geocode a batch of {len(batch)} addresses with {backend.name} ({type(e).__name__}: {e}).")
+                return batch, None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch, batch_results in executor.map(geocode_one_batch, batches):
+                if batch_results is None:
+                    errored.update(n for n, _ in batch)
+                    continue
+                for (normalized_address, _), (latitude, longitude, properties) in zip(batch, batch_results):
+                    if latitude is not None:
+                        found[normalized_address] = (latitude, longitude, properties)
+                        new_entries.append(new_entry(normalized_address, backend.name, latitude, longitude, properties))
+        print(f"{len(found)}/{len(to_geocode)} addresses geocoded after trying {backend.name}.")
+
+    # Only remember the failures for addresses that every backend actually answered for.
+    new_entries += [new_entry(n, 'none', None, None, None) for n in to_geocode if n not in found and n not in errored]
+    # The cache is only written from this thread, so that the worker threads
+    # don't each need their own database connection.
+    save_entries(new_entries)
+
+    for address, normalized_address in normalized.items():
+        if address not in results:
+            results[address] = found.get(normalized_address, (None, None, None))
+    return results
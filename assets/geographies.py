@@ -0,0 +1,108 @@
+"""Which geographies (Neighborhood, Tract, County, ...) each Location is in.
+
+These are precomputed into the LocationGeography table with one set-based
+INSERT ... SELECT ... ST_Contains join per geography level, so that questions
+like "which Assets are in this neighborhood?" become simple indexed lookups
+instead of ad-hoc spatial joins. The table is refreshed for individual Locations
+when they are saved (see assets/signals.py) and in full every night.
+
+The per-geography Asset counts in GeographyAssetSummary are derived from
+LocationGeography in the same way (one INSERT ... SELECT ... GROUP BY per level)."""
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from geo.models import Geography, GEOGRAPHY_LEVELS
+from assets.models import Asset, Location, LocationGeography, GeographyAssetSummary
+
+# Cached geography-summary responses include this version in their keys, so bumping
+# it (after a refresh) invalidates all of them at once.
+SUMMARY_VERSION_KEY = 'geography-summary-version'
+
+def refresh_location_geographies(location_ids=None, levels=None):
+    """Recompute the LocationGeography rows for the given Locations (or for all
+    Locations if location_ids is None) and geography levels (or all levels)."""
+    table = LocationGeography._meta.db_table
+    levels = levels or list(GEOGRAPHY_LEVELS.keys())
+    if location_ids is not None:
+        location_ids = list(location_ids)
+        if len(location_ids) == 0:
+            return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for geo_level in levels:
+            # The ids (in the base Geography table) of this level's geographies.
+            geography_ids_sql, geography_ids_params = GEOGRAPHY_LEVELS[geo_level].objects.values('id').query.sql_with_params()
+            if location_ids is None:
+                cursor.execute(f"DELETE FROM {table} WHERE geo_level = %s", [geo_level])
+                location_filter, location_params = '', []
+            else:
+                cursor.execute(f"DELETE FROM {table} WHERE geo_level = %s AND location_id = ANY(%s)", [geo_level, location_ids])
+                location_filter, location_params = 'AND l.id = ANY(%s)', [location_ids]
+            cursor.execute(f"""
+                INSERT INTO {table} (location_id, geography_id, geo_level)
+                SELECT l.id, g.id, %s
+                FROM {Location._meta.db_table} l
+                JOIN {Geography._meta.db_table} g ON ST_Contains(g.geom, l.geom)
+                WHERE l.geom IS NOT NULL
+                  AND g.id IN ({geography_ids_sql})
+                  {location_filter}
+                ON CONFLICT DO NOTHING
+                """, [geo_level] + list(geography_ids_params) + location_params)
+
+def geographies_matching(value):
+    """Parse a filter value like 'tract:42003010300' or 'neighborhood:Bloomfield'
+    (a geography level and either the primary key or the name of a geography at
+    that level) into a queryset of Geography ids."""
+    if ':' not in value:
+        raise ValidationError(f"Geography filters should look like <level>:<key> (for instance, tract:42003010300).")
+    geo_level, key = value.split(':', 1)
+    if geo_level not in GEOGRAPHY_LEVELS:
+        raise ValidationError(f"Unknown geography level '{geo_level}'. Choose from {', '.join(GEOGRAPHY_LEVELS.keys())}.")
+    model = GEOGRAPHY_LEVELS[geo_level]
+    try:
+        geographies = model.objects.filter(pk=model._meta.pk.to_python(key))
+    except ValidationError: # (An integer primary key, like a Neighborhood's, was given a name.)
+        geographies = model.objects.filter(name=key)
+    return geographies.values('id')
+
+def locations_in_geographies(values):
+    """Return a queryset of the ids of Locations in any of the geographies described
+    by values (see geographies_matching)."""
+    query = Q()
+    for value in values:
+        query |= Q(geography_id__in=geographies_matching(value))
+    return LocationGeography.objects.filter(query).values('location_id')
+
+def refresh_geography_asset_summaries(levels=None):
+    """Recount the displayable Assets of each type in each geography of the given
+    levels (or of all levels)."""
+    table = GeographyAssetSummary._meta.db_table
+    levels = levels or list(GEOGRAPHY_LEVELS.keys())
+    with transaction.atomic(), connection.cursor() as cursor:
+        for geo_level in levels:
+            # Pairs of (base Geography id, primary key at this level), e.g. a Tract's GEOID.
+            keys_sql, keys_params = GEOGRAPHY_LEVELS[geo_level].objects.values('id', 'pk').query.sql_with_params()
+            cursor.execute(f"DELETE FROM {table} WHERE geo_level = %s", [geo_level])
+            cursor.execute(f"""
+                INSERT INTO {table} (geo_level, geography_id, geo_key, category_id, asset_type_id, count)
+                SELECT %s, lg.geography_id, k.geo_key::text, a.primary_category_id, a.primary_asset_type_id, COUNT(*)
+                FROM {LocationGeography._meta.db_table} lg
+                JOIN ({keys_sql}) k (geography_id, geo_key) ON k.geography_id = lg.geography_id
+                JOIN {Asset._meta.db_table} a ON a.location_id = lg.location_id
+                WHERE lg.geo_level = %s
+                  AND a.do_not_display IS NOT TRUE
+                GROUP BY lg.geography_id, k.geo_key, a.primary_category_id, a.primary_asset_type_id
+                """, [geo_level] + list(keys_params) + [geo_level])
+    transaction.on_commit(lambda: cache.delete(SUMMARY_VERSION_KEY))
+
+def summary_cache_version():
+    """The current version for cached geography-summary responses (a new one is
+    started after each refresh)."""
+    version = cache.get(SUMMARY_VERSION_KEY)
+    if version is None:
+        version = str(time.time())
+        cache.set(SUMMARY_VERSION_KEY, version, timeout=None)
+    return version
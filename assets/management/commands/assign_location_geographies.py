@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from assets.geographies import GEOGRAPHY_LEVELS, refresh_location_geographies, refresh_geography_asset_summaries
+from assets.models import LocationGeography, GeographyAssetSummary
+
+class Command(BaseCommand):
+    help = """Recompute which geographies (Neighborhoods, Tracts, etc.) each Location is in
+    (the LocationGeography table) and recount the Assets in each geography (the
+    GeographyAssetSummary table).
+
+    Example: python manage.py assign_location_geographies --levels neighborhood,tract"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--levels', help=f"Comma-separated geography levels (default: all of {', '.join(GEOGRAPHY_LEVELS.keys())})")
+        parser.add_argument('--ids', help='Comma-separated list of Location IDs (default: all Locations)')
+
+    def handle(self, *args, **options):
+        levels = options['levels'].split(',') if options['levels'] else None
+        location_ids = [int(i) for i in options['ids'].split(',')] if options['ids'] else None
+        refresh_location_geographies(location_ids, levels)
+        print(f"There are now {LocationGeography.objects.count()} Location-geography links.")
+        refresh_geography_asset_summaries(levels)
+        print(f"There are now {GeographyAssetSummary.objects.count()} geography asset summary rows.")
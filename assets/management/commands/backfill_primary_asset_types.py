@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from assets.models import Asset, AssetType
+
+
+class Command(BaseCommand):
+    help = """Fill in the denormalized primary_asset_type and primary_category fields of every Asset
+    from its first linked AssetType. (After this has been run once, the m2m_changed handler keeps
+    these fields up to date.)"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of Assets to update per query.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        asset_types = AssetType.objects.in_bulk()
+
+        # Walk the through table once, in link order, to find the first AssetType of each Asset.
+        first_type_ids = {}
+        links = Asset.asset_types.through.objects.order_by('asset_id', 'id').values_list('asset_id', 'assettype_id')
+        for asset_id, asset_type_id in links.iterator():
+            first_type_ids.setdefault(asset_id, asset_type_id)
+
+        to_update = []
+        updated = 0
+        assets = Asset.objects.only('id', 'primary_asset_type_id', 'primary_category_id')
+        for asset in assets.iterator():
+            asset_type = asset_types.get(first_type_ids.get(asset.id))
+            category_id = getattr(asset_type, 'category_id', None)
+            if asset.primary_asset_type_id == getattr(asset_type, 'id', None) and asset.primary_category_id == category_id:
+                continue
+            asset.primary_asset_type = asset_type
+            asset.primary_category_id = category_id
+            to_update.append(asset)
+            if len(to_update) >= batch_size:
+                Asset.objects.bulk_update(to_update, ['primary_asset_type', 'primary_category'])
+                updated += len(to_update)
+                print(f"Updated {updated} Assets so far.")
+                to_update = []
+
+        if len(to_update) > 0:
+            Asset.objects.bulk_update(to_update, ['primary_asset_type', 'primary_category'])
+            updated += len(to_update)
+        print(f"Backfilled primary_asset_type/primary_category for {updated} Assets.")
@@ -9,6 +9,7 @@ import phonenumbers
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from assets.history import bulk_history
 from assets.models import (Asset,
                            Organization,
                            Location,
@@ -241,6 +242,10 @@ class Command(BaseCommand):
         parser.add_argument('args', nargs='*')
 
     def handle(self, *args, **options):
+        with bulk_history(): # (This writes the history records of all the saves in batches.)
+            self.load(*args, **options)
+
+    def load(self, *args, **options):
 
         override_clearing = True # Sometimes we may not want to clear assets when loading assets.
         # In fact, eventually loading based on primary_key_from_rocket/synthesized_key will be the default.
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from assets.asset_index import create_asset_index, refresh_asset_index
+
+
+class Command(BaseCommand):
+    help = """Create (or refresh) the asset index materialized view that backs the map points.
+    Use --recreate after changing the view definition in assets/asset_index.py."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recreate', action='store_true',
+                            help='Drop the materialized view and build it again from scratch.')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Just refresh the existing materialized view.')
+
+    def handle(self, *args, **options):
+        if options['refresh']:
+            refresh_asset_index()
+            print("Refreshed the asset index.")
+        else:
+            create_asset_index(drop_first=options['recreate'])
+            print("Created the asset index.")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from assets.search import SEARCH_DOCUMENTS, create_search_indexes, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = """Create the trigram indexes used by search (and by admin searches) and fill in
+    the search vectors of all searchable models (see assets/search.py).
+
+    Run this after the migrations that add the search_vector fields, and again
+    after changing a search document."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-vectors', action='store_true',
+                            help="Just create the indexes (don't recompute the search vectors).")
+
+    def handle(self, *args, **options):
+        create_search_indexes()
+        print("Created the trigram indexes.")
+        if not options['skip_vectors']:
+            for model in SEARCH_DOCUMENTS:
+                update_search_vectors(model)
+                print(f"Updated the search vectors of {model.objects.count()} {model._meta.verbose_name_plural}.")
@@ -11,10 +11,10 @@ def to_dict_for_csv(asset: Asset, for_carto=False):
     return {
         'id': asset.id,
         'name': asset.name,
-        'asset_type': asset.asset_types.all()[0].name,
-        'asset_type_title': asset.asset_types.all()[0].title,
-        'category': asset.category.name,
-        'category_title': asset.category.title,
+        'asset_type': asset.primary_asset_type.name,
+        'asset_type_title': asset.primary_asset_type.title,
+        'category': asset.primary_category.name,
+        'category_title': asset.primary_category.title,
         'sensitive': asset.sensitive,
         'do_not_display': asset.do_not_display,
         'latitude': asset.location.latitude,
@@ -62,5 +62,6 @@ class Command(BaseCommand):
             writer.writeheader()
             asset_set = Asset.objects.all() if not asset_types else Asset.objects.filter(
                 asset_types__name__in=asset_types)
+            asset_set = asset_set.select_related('primary_asset_type', 'primary_category', 'location')
             for asset in asset_set:
                 writer.writerow(to_dict_for_csv(asset, for_carto=for_carto))
@@ -11,10 +11,10 @@ def to_dict_for_csv(asset: Asset):
     return {
         'id': asset.id,
         'name': asset.name,
-        'asset_type': asset.asset_types.all()[0].name,
-        'asset_type_title': asset.asset_types.all()[0].title,
-        'category': asset.category.name if asset.category is not None else '',
-        'category_title': asset.category.title if asset.category is not None else '',
+        'asset_type': asset.primary_asset_type.name,
+        'asset_type_title': asset.primary_asset_type.title,
+        'category': asset.primary_category.name if asset.primary_category is not None else '',
+        'category_title': asset.primary_category.title if asset.primary_category is not None else '',
         'sensitive': asset.sensitive,
         'do_not_display': asset.do_not_display,
         'latitude': asset.location.latitude,
@@ -47,6 +47,7 @@ class Command(BaseCommand):
             print(f"Dumping just the assets of these types: {chosen_asset_types}")
             raise ValueError("Still need to implement filtering of assets to multiple types.")
             
+        assets_iterator = assets_iterator.select_related('primary_asset_type', 'primary_category', 'location')
         output_file = os.path.join(settings.BASE_DIR, filename)
 
         with open(output_file, 'w') as f:
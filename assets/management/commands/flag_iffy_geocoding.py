@@ -0,0 +1,99 @@
+import csv
+import sys
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from simple_history.utils import bulk_update_with_history
+
+from assets.models import Asset, Location
+from assets.spatial import LocationIndex
+from assets.utils import normalize_address
+
+def spatial_groups(index, radius):
+    """Group the indexed Locations into clusters of points that are (transitively)
+    within radius feet of each other, returning the clusters with more than one
+    Location as lists of Location ids."""
+    pairs = index.pairs_within(radius)
+    n = len(index)
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    clusters = defaultdict(list)
+    for position, label in enumerate(labels):
+        clusters[label].append(index.ids[position])
+    return [ids for ids in clusters.values() if len(ids) > 1]
+
+def address_key(location):
+    return (normalize_address(location.street_address), (location.zip_code or '')[:5])
+
+def unit_groups(locations):
+    """Find street addresses for which some Locations have a unit (like a suite
+    number) and others don't. The ones without units are the iffy ones, since
+    they're probably missing their unit. Returns a list of (all ids, iffy ids)."""
+    by_address = defaultdict(list)
+    for location in locations:
+        if location.street_address not in [None, '']:
+            by_address[address_key(location)].append(location)
+    groups = []
+    for group in by_address.values():
+        with_unit = [l for l in group if l.unit not in [None, ''] or l.unit_type not in [None, '']]
+        without_unit = [l for l in group if l not in with_unit]
+        if len(with_unit) > 0 and len(without_unit) > 0:
+            groups.append(([l.id for l in group], [l.id for l in without_unit]))
+    return groups
+
+class Command(BaseCommand):
+    help = """Look for Locations with iffy geocoding across the whole Location table:
+    1) clusters of Locations (with at least two Assets between them) within --radius feet
+    of each other that have different addresses, and 2) street addresses for which other
+    Locations have units (like Suites) but this one doesn't. The candidate groups are
+    written as CSV (to --output or stdout), and iffy_geocoding is set to True for the
+    flagged Locations (unless it has already been set by someone).
+
+    Example: python manage.py flag_iffy_geocoding --radius 30 --output iffy.csv --dry-run"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--radius', type=float, default=30.0, help='Distance (in feet) within which Locations are considered to be at the same place')
+        parser.add_argument('--output', help='File to write the candidate groups to (as CSV)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        # (All the fields are loaded since the history records written below need them.)
+        locations = {l.id: l for l in Location.objects.all()}
+        asset_counts = dict(Asset.objects.exclude(do_not_display=True).filter(location__isnull=False)
+            .values_list('location_id').annotate(count=Count('id')))
+
+        index = LocationIndex.from_locations(Location.objects.all())
+        groups = [] # (reason, all ids, ids to flag)
+        for ids in spatial_groups(index, options['radius']):
+            if len(set(address_key(locations[i]) for i in ids)) > 1 and sum(asset_counts.get(i, 0) for i in ids) > 1:
+                groups.append(('nearby Locations with different addresses', ids, ids))
+        for ids, iffy_ids in unit_groups(locations.values()):
+            groups.append(('address has other Locations with units', ids, iffy_ids))
+
+        f = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        writer = csv.writer(f)
+        writer.writerow(['group', 'reason', 'location_id', 'flagged', 'name', 'street_address', 'unit', 'unit_type',
+            'zip_code', 'latitude', 'longitude', 'asset_count', 'iffy_geocoding'])
+        to_flag = set()
+        for n, (reason, ids, iffy_ids) in enumerate(groups):
+            for i in ids:
+                l = locations[i]
+                writer.writerow([n, reason, i, i in iffy_ids, l.name, l.street_address, l.unit, l.unit_type,
+                    l.zip_code, l.latitude, l.longitude, asset_counts.get(i, 0), l.iffy_geocoding])
+            to_flag.update(iffy_ids)
+        if options['output']:
+            f.close()
+
+        # iffy_geocoding == False means that someone has decided the geocoordinates are
+        # correct, so only previously unreviewed (None) values are changed.
+        changed = [locations[i] for i in to_flag if locations[i].iffy_geocoding is None]
+        for location in changed:
+            location.iffy_geocoding = True
+            location._change_reason = 'Flagging iffy geocoding (flag_iffy_geocoding)'
+        print(f"Found {len(groups)} candidate groups. {len(changed)} Locations {'would be' if options['dry_run'] else 'are being'} flagged as having iffy geocoding.", file=sys.stderr)
+        if not options['dry_run']:
+            bulk_update_with_history(changed, Location, ['iffy_geocoding'], batch_size=1000)
@@ -9,6 +9,7 @@ import phonenumbers
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from assets.history import bulk_history
 from assets.models import (RawAsset,
                            Asset,
                            AssetType,
@@ -29,6 +30,10 @@ class Command(BaseCommand):
         parser.add_argument('args', nargs='*')
 
     def handle(self, *args, **options):
+        with bulk_history(): # (This writes the history records of all the saves in batches.)
+            self.load(*args, **options)
+
+    def load(self, *args, **options):
 
         clear_first = False # Usually we don't want to clear RawAssets when loading them.
 
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from assets.history import collapse_noop_history, prune_old_history, archive_history
+from assets.models import Asset, RawAsset, Location, Organization
+
+HISTORY_MODELS = {'asset': Asset, 'rawasset': RawAsset, 'location': Location, 'organization': Organization}
+
+class Command(BaseCommand):
+    help = """Keep the history tables (HistoricalAsset, HistoricalRawAsset, HistoricalLocation,
+    and HistoricalOrganization) from growing without bound.
+
+    In order, this can:
+        * collapse change records that didn't change anything (--collapse-noops),
+        * delete records beyond each object's most recent N versions and/or older
+          than D days (--keep-versions N, --keep-days D; when both are given, a
+          record is kept if it meets either condition, and the latest record of
+          each object is always kept), and
+        * move records older than D days into yearly archive tables
+          (--archive-after D).
+
+    Example: python manage.py prune_history --collapse-noops --keep-versions 20 --keep-days 365 --dry-run"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--models', help=f"Comma-separated models to prune (default: all of {', '.join(HISTORY_MODELS.keys())})")
+        parser.add_argument('--collapse-noops', action='store_true', help="Delete change records identical to the previous version.")
+        parser.add_argument('--keep-versions', type=int, help="Keep this many of each object's most recent records.")
+        parser.add_argument('--keep-days', type=int, help="Keep records from the last this many days.")
+        parser.add_argument('--archive-after', type=int, help="Move records older than this many days into yearly archive tables.")
+        parser.add_argument('--dry-run', action='store_true', help="Just report how many records would be affected.")
+
+    def handle(self, *args, **options):
+        names = options['models'].split(',') if options['models'] else list(HISTORY_MODELS.keys())
+        unknown = [name for name in names if name not in HISTORY_MODELS]
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(unknown)}")
+        if options['keep_versions'] is not None and options['keep_versions'] < 1:
+            raise CommandError("--keep-versions must be at least 1.")
+        if not (options['collapse_noops'] or options['keep_versions'] is not None
+                or options['keep_days'] is not None or options['archive_after'] is not None):
+            raise CommandError("Nothing to do. Choose at least one of --collapse-noops, --keep-versions, --keep-days, and --archive-after.")
+
+        dry_run = options['dry_run']
+        verb = 'would be' if dry_run else 'were'
+        for name in names:
+            historical_model = HISTORY_MODELS[name].history.model
+            label = historical_model._meta.verbose_name_plural
+            if options['collapse_noops']:
+                count = collapse_noop_history(historical_model, dry_run=dry_run)
+                print(f"{count} no-op {label} {verb} deleted.")
+            if options['keep_versions'] is not None or options['keep_days'] is not None:
+                count = prune_old_history(historical_model, options['keep_versions'], options['keep_days'], dry_run=dry_run)
+                print(f"{count} old {label} {verb} deleted.")
+            if options['archive_after'] is not None:
+                before = timezone.now() - timedelta(days=options['archive_after'])
+                count = archive_history(historical_model, before, dry_run=dry_run)
+                print(f"{count} {label} {verb} archived.")
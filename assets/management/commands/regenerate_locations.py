@@ -7,6 +7,8 @@ import phonenumbers
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from assets.history import bulk_history
+
 from assets.models import (Asset,
                            Organization,
                            Location,
@@ -20,7 +22,7 @@ csv.field_size_limit(sys.maxsize)  # looks like this:
 
 from assets.management.commands.util import parse_cell
 from assets.management.commands.clear_and_load_by_type import get_location_by_keys, update_or_create_location
-from assets.utils import geocode_address # This uses Geocod.io
+from assets.utils import geocode_address # This uses the geocoder backends (see assets/geocoders.py).
 
 # _csv.Error: field larger than field limit (131072)
 
@@ -163,8 +165,8 @@ def split_location(location_id, dry_run):
                             location.save()
             asset.location = location
             asset._change_reason = 'Regenerating locations (bad initial Location assignment)'
-            if not dry_run:
-                asset.save()
+            if not dry_run: # (This Asset was checked for a RawAsset above, so save() needn't check again.)
+                asset.save(check_raw_assets=False)
             assets_handled += 1
 
     print(f"Handled {assets_handled}/{total} asset locations. (Some may have been pre-existing.)")
@@ -181,4 +183,5 @@ class Command(BaseCommand):
         dry_run = False
         if len(args) != 1:
             raise ValueError("This script accepts exactly one command-line argument, which should be a valid Location ID.")
-        split_location(args[0], dry_run)
+        with bulk_history():
+            split_location(args[0], dry_run)
@@ -20,23 +20,9 @@ csv.field_size_limit(sys.maxsize)  # looks like this:
 
 from assets.management.commands.util import parse_cell
 from assets.management.commands.clear_and_load_by_type import get_location_by_keys, update_or_create_location
-from assets.utils import geocode_address # This uses Geocod.io
+from assets.utils import geocode_address, form_full_address_from_location # This uses the geocoder backends (see assets/geocoders.py).
 # _csv.Error: field larger than field limit (131072)
 
-def form_full_address_from_location(location):
-    maybe_malformed = False
-    if location.city not in ['', None]:
-        city = location.city
-    else:
-        city = location.municipality
-
-    if location.state not in ['', None]:
-        state = location.state
-    else:
-        state = 'PA'
-
-    return "{}, {}, {} {}".format(location.street_address, city, state, location.zip_code)
-
 def regeocode(location_id, dry_run):
     location = Location.objects.get(pk=location_id)
     total = len(location.asset_set.all())
@@ -46,7 +32,8 @@ def regeocode(location_id, dry_run):
         
         full_address = form_full_address_from_location(location)
         # Try to geocode with Geocod.io/Geomancer
-        latitude, longitude, properties = geocode_address(full_address)
+        # (Not with the local backend, which would just return this Location's current geocoordinates.)
+        latitude, longitude, properties = geocode_address(full_address, use_local=False)
         if latitude is None:
             #print(f"Geocoordinates for Location ID {location.id} are being set to (None, None).")
             print(f"Skipping this one since the return geocoordinates are (None, None).")
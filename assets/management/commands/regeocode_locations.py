@@ -0,0 +1,75 @@
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from simple_history.utils import bulk_update_with_history
+
+from assets.models import Location
+from assets.geocoding import geocode_batch
+from assets.geocoders import backend_stats
+from assets.tasks import schedule_asset_index_refresh, schedule_location_geographies_refresh, schedule_search_vector_update
+from assets.utils import form_full_address_from_location
+
+def regeocode_locations(locations, dry_run, batch_size, workers, rate, use_cache):
+    locations = [l for l in locations if l.street_address not in [None, '']]
+    addresses = {l.id: form_full_address_from_location(l) for l in locations}
+    print(f"Geocoding {len(set(addresses.values()))} distinct addresses for {len(locations)} Locations.")
+    results = geocode_batch(list(set(addresses.values())), batch_size=batch_size, workers=workers, rate=rate, use_cache=use_cache,
+        use_local=False) # (The local backend would just return the Locations' current geocoordinates.)
+
+    changed = []
+    skipped = 0
+    for location in locations:
+        latitude, longitude, properties = results[addresses[location.id]]
+        if latitude is None:
+            skipped += 1 # Like regeocode_location, don't replace existing geocoordinates with (None, None).
+            continue
+        location.latitude = latitude
+        location.longitude = longitude
+        location.geom = Point(longitude, latitude) # (Location.save() wouldn't update geom, since it's already set.)
+        location.geocoding_properties = properties
+        location._change_reason = 'Regeocoding location'
+        changed.append(location)
+
+    print(f"{len(changed)} Locations {'would be' if dry_run else 'are being'} updated ({skipped} could not be geocoded).")
+    if not dry_run:
+        for i in range(0, len(changed), 1000):
+            batch = changed[i:i + 1000]
+            location_ids = [l.id for l in batch]
+            with transaction.atomic():
+                bulk_update_with_history(batch, Location, ['latitude', 'longitude', 'geom', 'geocoding_properties'])
+                # Bulk updates don't send the signals that would otherwise schedule these.
+                transaction.on_commit(lambda location_ids=location_ids: schedule_location_geographies_refresh(location_ids))
+                schedule_search_vector_update(Location, location_ids)
+        if len(changed) > 0:
+            schedule_asset_index_refresh()
+    for name, stats in backend_stats().items():
+        print(f"{name}: {stats}")
+
+class Command(BaseCommand):
+    help = """Regeocode the Locations selected by the options (for instance, all the ones
+    with iffy geocoding) based on their address information, using batch geocoding.
+
+    Example: python manage.py regeocode_locations --iffy --dry-run"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', help='Comma-separated list of Location IDs')
+        parser.add_argument('--iffy', action='store_true', help='Select Locations with iffy_geocoding == True')
+        parser.add_argument('--ungeocoded', action='store_true', help='Select Locations that have no geocoordinates')
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--refresh', action='store_true', help='Ignore cached geocoding results')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Addresses per geocoding request')
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of concurrent geocoding requests')
+        parser.add_argument('--rate', type=float, default=1.0, help='Maximum number of geocoding requests per second')
+
+    def handle(self, *args, **options):
+        locations = Location.objects.all()
+        if options['ids']:
+            locations = locations.filter(id__in=[int(i) for i in options['ids'].split(',')])
+        if options['iffy']:
+            locations = locations.filter(iffy_geocoding=True)
+        if options['ungeocoded']:
+            locations = locations.filter(latitude__isnull=True)
+        if not (options['ids'] or options['iffy'] or options['ungeocoded']):
+            raise ValueError("Select some Locations with --ids, --iffy, and/or --ungeocoded.")
+        regeocode_locations(list(locations), options['dry_run'], options['batch_size'],
+            options['workers'], options['rate'], not options['refresh'])
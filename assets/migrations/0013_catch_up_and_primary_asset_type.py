@@ -0,0 +1,337 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+from django.conf import settings
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import phonenumber_field.modelfields
+import simple_history.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('assets', '0012_remove_asset_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BaseAsset',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('localizability', models.CharField(blank=True, choices=[('FIX', 'Fixed'), ('MOB', 'Mobile'), ('VIR', 'Cyber')], max_length=3, null=True)),
+                ('url', models.URLField(blank=True, max_length=500, null=True)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('hours_of_operation', models.TextField(blank=True, null=True)),
+                ('holiday_hours_of_operation', models.TextField(blank=True, null=True)),
+                ('periodicity', models.CharField(blank=True, max_length=100, null=True)),
+                ('capacity', models.IntegerField(blank=True, null=True)),
+                ('wifi_network', models.CharField(blank=True, max_length=100, null=True)),
+                ('wifi_notes', models.TextField(blank=True, null=True)),
+                ('child_friendly', models.BooleanField(blank=True, null=True)),
+                ('internet_access', models.BooleanField(blank=True, null=True)),
+                ('computers_available', models.BooleanField(blank=True, null=True)),
+                ('accessibility', models.BooleanField(blank=True, null=True)),
+                ('open_to_public', models.BooleanField(blank=True, null=True)),
+                ('sensitive', models.BooleanField(blank=True, null=True)),
+                ('do_not_display', models.BooleanField(blank=True, null=True)),
+                ('etl_notes', models.TextField(blank=True, null=True)),
+                ('primary_key_from_rocket', models.TextField(blank=True, null=True)),
+                ('synthesized_key', models.TextField(blank=True, null=True)),
+                ('date_entered', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('asset_types', models.ManyToManyField(to='assets.AssetType')),
+                ('data_source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='assets.DataSource')),
+                ('hard_to_count_population', models.ManyToManyField(blank=True, to='assets.TargetPopulation')),
+                ('services', models.ManyToManyField(blank=True, to='assets.ProvidedService')),
+                ('tags', models.ManyToManyField(blank=True, to='assets.Tag')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HistoricalAsset',
+            fields=[
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('localizability', models.CharField(blank=True, choices=[('FIX', 'Fixed'), ('MOB', 'Mobile'), ('VIR', 'Cyber')], max_length=3, null=True)),
+                ('url', models.URLField(blank=True, max_length=500, null=True)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('hours_of_operation', models.TextField(blank=True, null=True)),
+                ('holiday_hours_of_operation', models.TextField(blank=True, null=True)),
+                ('periodicity', models.CharField(blank=True, max_length=100, null=True)),
+                ('capacity', models.IntegerField(blank=True, null=True)),
+                ('wifi_network', models.CharField(blank=True, max_length=100, null=True)),
+                ('wifi_notes', models.TextField(blank=True, null=True)),
+                ('child_friendly', models.BooleanField(blank=True, null=True)),
+                ('internet_access', models.BooleanField(blank=True, null=True)),
+                ('computers_available', models.BooleanField(blank=True, null=True)),
+                ('accessibility', models.BooleanField(blank=True, null=True)),
+                ('open_to_public', models.BooleanField(blank=True, null=True)),
+                ('sensitive', models.BooleanField(blank=True, null=True)),
+                ('do_not_display', models.BooleanField(blank=True, null=True)),
+                ('etl_notes', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, max_length=1000, null=True)),
+                ('primary_key_from_rocket', models.TextField(blank=True, null=True)),
+                ('synthesized_key', models.TextField(blank=True, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, editable=False)),
+                ('last_updated', models.DateTimeField(blank=True, editable=False)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('data_source', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.DataSource')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical asset',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalLocation',
+            fields=[
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(editable=False, max_length=255)),
+                ('street_address', models.CharField(blank=True, max_length=100, null=True)),
+                ('unit', models.CharField(blank=True, max_length=20, null=True)),
+                ('unit_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('municipality', models.CharField(blank=True, max_length=50, null=True)),
+                ('city', models.CharField(blank=True, max_length=50, null=True)),
+                ('state', models.CharField(blank=True, max_length=50, null=True)),
+                ('zip_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('parcel_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('residence', models.BooleanField(blank=True, null=True)),
+                ('available_transportation', models.TextField(blank=True, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('geom', django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326)),
+                ('geocoding_properties', models.TextField(blank=True, null=True)),
+                ('iffy_geocoding', models.BooleanField(blank=True, null=True)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical location',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalOrganization',
+            fields=[
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical organization',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalRawAsset',
+            fields=[
+                ('baseasset_ptr', models.ForeignKey(auto_created=True, blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, parent_link=True, related_name='+', to='assets.BaseAsset')),
+                ('id', models.IntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('localizability', models.CharField(blank=True, choices=[('FIX', 'Fixed'), ('MOB', 'Mobile'), ('VIR', 'Cyber')], max_length=3, null=True)),
+                ('url', models.URLField(blank=True, max_length=500, null=True)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('hours_of_operation', models.TextField(blank=True, null=True)),
+                ('holiday_hours_of_operation', models.TextField(blank=True, null=True)),
+                ('periodicity', models.CharField(blank=True, max_length=100, null=True)),
+                ('capacity', models.IntegerField(blank=True, null=True)),
+                ('wifi_network', models.CharField(blank=True, max_length=100, null=True)),
+                ('wifi_notes', models.TextField(blank=True, null=True)),
+                ('child_friendly', models.BooleanField(blank=True, null=True)),
+                ('internet_access', models.BooleanField(blank=True, null=True)),
+                ('computers_available', models.BooleanField(blank=True, null=True)),
+                ('accessibility', models.BooleanField(blank=True, null=True)),
+                ('open_to_public', models.BooleanField(blank=True, null=True)),
+                ('sensitive', models.BooleanField(blank=True, null=True)),
+                ('do_not_display', models.BooleanField(blank=True, null=True)),
+                ('etl_notes', models.TextField(blank=True, null=True)),
+                ('primary_key_from_rocket', models.TextField(blank=True, null=True)),
+                ('synthesized_key', models.TextField(blank=True, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, editable=False)),
+                ('last_updated', models.DateTimeField(blank=True, editable=False)),
+                ('street_address', models.CharField(blank=True, max_length=100, null=True)),
+                ('municipality', models.CharField(blank=True, max_length=50, null=True)),
+                ('city', models.CharField(blank=True, max_length=50, null=True)),
+                ('state', models.CharField(blank=True, max_length=50, null=True)),
+                ('zip_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('parcel_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('residence', models.BooleanField(blank=True, null=True)),
+                ('available_transportation', models.TextField(blank=True, null=True)),
+                ('parent_location', models.CharField(blank=True, max_length=50, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('geom', django.contrib.gis.db.models.fields.PointField(null=True, srid=4326)),
+                ('geocoding_properties', models.TextField(blank=True, null=True)),
+                ('organization_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('organization_email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('organization_phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('raw_asset_notes', models.TextField(blank=True, max_length=1000, null=True)),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField()),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+            ],
+            options={
+                'verbose_name': 'historical raw asset',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': 'history_date',
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.RemoveField(
+            model_name='asset',
+            name='accessibility_features',
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='accessibility',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='primary_asset_type',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='primary_assets', to='assets.AssetType'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='primary_category',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='primary_assets', to='assets.Category'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='synthesized_key',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='wifi_notes',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='geocoding_properties',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='iffy_geocoding',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='municipality',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='unit',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='unit_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='location',
+            name='geom',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326),
+        ),
+        migrations.CreateModel(
+            name='RawAsset',
+            fields=[
+                ('baseasset_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='assets.BaseAsset')),
+                ('street_address', models.CharField(blank=True, max_length=100, null=True)),
+                ('municipality', models.CharField(blank=True, max_length=50, null=True)),
+                ('city', models.CharField(blank=True, max_length=50, null=True)),
+                ('state', models.CharField(blank=True, max_length=50, null=True)),
+                ('zip_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('parcel_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('residence', models.BooleanField(blank=True, null=True)),
+                ('available_transportation', models.TextField(blank=True, null=True)),
+                ('parent_location', models.CharField(blank=True, max_length=50, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('geom', django.contrib.gis.db.models.fields.PointField(null=True, srid=4326)),
+                ('geocoding_properties', models.TextField(blank=True, null=True)),
+                ('organization_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('organization_email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('organization_phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region=None)),
+                ('raw_asset_notes', models.TextField(blank=True, max_length=1000, null=True)),
+                ('asset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='assets.Asset')),
+            ],
+            bases=('assets.baseasset',),
+        ),
+        migrations.DeleteModel(
+            name='AccessibilityFeature',
+        ),
+        migrations.AddField(
+            model_name='historicalrawasset',
+            name='asset',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Asset'),
+        ),
+        migrations.AddField(
+            model_name='historicalrawasset',
+            name='data_source',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.DataSource'),
+        ),
+        migrations.AddField(
+            model_name='historicalrawasset',
+            name='history_user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='historicalorganization',
+            name='location',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Location'),
+        ),
+        migrations.AddField(
+            model_name='historicallocation',
+            name='parent_location',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Location'),
+        ),
+        migrations.AddField(
+            model_name='historicalasset',
+            name='location',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Location'),
+        ),
+        migrations.AddField(
+            model_name='historicalasset',
+            name='organization',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Organization'),
+        ),
+        migrations.AddField(
+            model_name='historicalasset',
+            name='primary_asset_type',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.AssetType'),
+        ),
+        migrations.AddField(
+            model_name='historicalasset',
+            name='primary_category',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.Category'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+# The view as it was defined in assets/asset_index.py when this migration was written
+# (later changes are applied with `manage.py create_asset_index --recreate`).
+CREATE_ASSET_INDEX = """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS assets_assetindex AS
+    SELECT a.id,
+           a.name,
+           t.name AS asset_type,
+           t.title AS asset_type_title,
+           c.name AS category,
+           c.title AS category_title,
+           a.sensitive,
+           l.id AS location_id,
+           l.street_address,
+           l.city,
+           l.state,
+           l.zip_code,
+           l.geom
+    FROM assets_asset a
+    JOIN assets_location l ON l.id = a.location_id
+    LEFT JOIN assets_assettype t ON t.id = a.primary_asset_type_id
+    LEFT JOIN assets_category c ON c.id = a.primary_category_id
+    WHERE a.do_not_display IS NOT TRUE
+      AND l.geom IS NOT NULL
+    WITH DATA;
+    CREATE UNIQUE INDEX IF NOT EXISTS assets_assetindex_id ON assets_assetindex (id);
+    CREATE INDEX IF NOT EXISTS assets_assetindex_geom ON assets_assetindex USING GIST (geom);
+    CREATE INDEX IF NOT EXISTS assets_assetindex_category ON assets_assetindex (category);
+    CREATE INDEX IF NOT EXISTS assets_assetindex_asset_type ON assets_assetindex (asset_type);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0013_catch_up_and_primary_asset_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('asset_type', models.CharField(max_length=255, null=True)),
+                ('asset_type_title', models.CharField(max_length=255, null=True)),
+                ('category', models.CharField(max_length=255, null=True)),
+                ('category_title', models.CharField(max_length=255, null=True)),
+                ('sensitive', models.BooleanField(null=True)),
+                ('location_id', models.IntegerField()),
+                ('street_address', models.CharField(max_length=100, null=True)),
+                ('city', models.CharField(max_length=50, null=True)),
+                ('state', models.CharField(max_length=50, null=True)),
+                ('zip_code', models.CharField(max_length=10, null=True)),
+                ('geom', django.contrib.gis.db.models.fields.PointField(srid=4326)),
+            ],
+            options={
+                'verbose_name_plural': 'asset index',
+                'db_table': 'assets_assetindex',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(CREATE_ASSET_INDEX, "DROP MATERIALIZED VIEW IF EXISTS assets_assetindex"),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0015_assetupdatejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_address', models.CharField(max_length=500, unique=True)),
+                ('provider', models.CharField(max_length=50)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('properties', models.TextField(blank=True, null=True)),
+                ('succeeded', models.BooleanField(default=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'geocode cache entries',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0002_auto_20200521_1533'),
+        ('assets', '0016_geocodecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationGeography',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geo_level', models.CharField(max_length=30)),
+                ('geography', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_links', to='geo.Geography')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geographies', to='assets.Location')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='locationgeography',
+            index=models.Index(fields=['geography', 'location'], name='assets_loca_geograp_1bec9b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locationgeography',
+            index=models.Index(fields=['geo_level', 'location'], name='assets_loca_geo_lev_3599d1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='locationgeography',
+            unique_together={('location', 'geography')},
+        ),
+    ]
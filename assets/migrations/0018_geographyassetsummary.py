@@ -0,0 +1,38 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0002_auto_20200521_1533'),
+        ('assets', '0017_locationgeography'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeographyAssetSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geo_level', models.CharField(max_length=30)),
+                ('geo_key', models.CharField(max_length=30)),
+                ('count', models.IntegerField()),
+                ('asset_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='assets.AssetType')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='assets.Category')),
+                ('geography', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asset_summaries', to='geo.Geography')),
+            ],
+            options={
+                'verbose_name_plural': 'geography asset summaries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='geographyassetsummary',
+            index=models.Index(fields=['geo_level', 'geo_key'], name='assets_geog_geo_lev_512431_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='geographyassetsummary',
+            index=models.Index(fields=['geo_level', 'category'], name='assets_geog_geo_lev_d97ef3_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.0.14 on 2026-10-19 16:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0018_geographyassetsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='assets_asse_search__cdde8b_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='assets_loca_search__b6d9ad_gin'),
+        ),
+    ]
@@ -1,9 +1,13 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.gis.geos import Point
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
-from simple_history.models import HistoricalRecords
+from assets.history import BufferedHistoricalRecords
 
-from assets.utils import geocode_address
 from assets.util_carto import sync_asset_to_carto, get_carto_asset_ids, fix_carto_geofields
 
 from pprint import pprint
@@ -82,8 +86,12 @@ class Location(models.Model):
 
     # Notes about this or other things (like missing Suite numbers) may be added to
     # the geocoding_properties field.
+    search_vector = SearchVectorField(null=True, editable=False) # Maintained by assets/search.py
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords(excluded_fields=['search_vector'])
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'])]
 
     @property
     def full_address(self):
@@ -97,8 +105,23 @@ class Location(models.Model):
             return ', '.join(parts)
         return ""
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored geom so that saving a Location that didn't move doesn't
+        # refresh its geographies (see assets/signals.py).
+        if 'geom' in instance.__dict__:
+            instance._loaded_geom = instance.geom
+        return instance
+
     def save(self, *args, **kwargs):
         """ When the model is saved, add geom and name (if needed). """
+        self.fill_in_name_and_geom()
+        super(Location, self).save(*args, **kwargs)
+
+    def fill_in_name_and_geom(self):
+        """Add geom and name (if needed). This is separate from save() so that
+        it can also be applied to Locations that are written with bulk_update."""
         if not self.pk or self.name == 'None, None None None':
             if self.street_address not in [None, '']:
                 parts = [self.street_address] # The next few lines are just full_address.
@@ -126,7 +149,6 @@ class Location(models.Model):
             self.geom = Point(
                 (float(self.longitude), float(self.latitude))
             ) if self.latitude and self.longitude else None
-        super(Location, self).save(*args, **kwargs)
 
     def __str__(self):
         return self.name or '<MISSING NAME>'
@@ -138,7 +160,7 @@ class Organization(models.Model):
     email = models.EmailField(null=True, blank=True)
     phone = PhoneNumberField(null=True, blank=True)
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     def __str__(self):
         return self.name or '<MISSING NAME>'
@@ -284,7 +306,7 @@ class RawAsset(BaseAsset):
 
     asset = models.ForeignKey('Asset', on_delete=models.SET_NULL, null=True, blank=True)
 
-    history = HistoricalRecords()  # This adds a HistoricalRawAsset table to the database, which
+    history = BufferedHistoricalRecords()  # This adds a HistoricalRawAsset table to the database, which
     # will record a new row every time a tracked change (model creation, change, or deletion)
     # occurs. This field needs to be added explicitly to every table to be tracked (it is
     # not inherited from a parent model). However, fields inherited from a parent model
@@ -330,6 +352,14 @@ class Asset(models.Model):
     do_not_display = models.BooleanField(null=True, blank=True)
 
     asset_types = models.ManyToManyField('AssetType')
+    primary_asset_type = models.ForeignKey('AssetType', on_delete=models.SET_NULL, null=True, blank=True,
+                                           editable=False, related_name='primary_assets')
+    primary_category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True,
+                                         editable=False, related_name='primary_assets')
+    # primary_asset_type and primary_category are denormalized copies of the first linked
+    # AssetType (and its Category). They are maintained by the m2m_changed handler in
+    # assets/signals.py so that readers can get them with select_related instead of
+    # running two queries every time the category is needed.
     location = models.ForeignKey('Location', on_delete=models.SET_NULL, null=True, blank=True)
     organization = models.ForeignKey('Organization', on_delete=models.PROTECT, null=True, blank=True) # [ ] Maybe change this to SET_NULL (Organizations should be deletable).
     services = models.ManyToManyField('ProvidedService', blank=True)
@@ -343,20 +373,47 @@ class Asset(models.Model):
     synthesized_key = models.TextField(null=True, blank=True)
     date_entered = models.DateTimeField(editable=False, auto_now_add=True)
     last_updated = models.DateTimeField(editable=False, auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False) # Maintained by assets/search.py
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords(excluded_fields=['search_vector'])
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'])]
 
     @property
     def category(self):
-        return self.asset_types.all()[0].category
+        return self.primary_category
+
+    def first_asset_type(self):
+        """Return the first AssetType linked to this Asset (in the order the links
+        were made), which is the one that gets treated as the Asset's type."""
+        link = self.asset_types.through.objects.filter(asset_id=self.pk).order_by('id') \
+            .select_related('assettype').first()
+        return link.assettype if link is not None else None
+
+    def refresh_primary_asset_type(self):
+        """Recompute primary_asset_type/primary_category from the asset_types links.
+
+        This writes the two columns with a queryset update (rather than save()) so that
+        it does not trigger a Carto sync or a new history record."""
+        asset_type = self.first_asset_type()
+        self.primary_asset_type = asset_type
+        self.primary_category = getattr(asset_type, 'category', None)
+        Asset.objects.filter(pk=self.pk).update(primary_asset_type=self.primary_asset_type,
+                                                primary_category=self.primary_category)
 
     def __str__(self):
         return self.name or '<MISSING NAME>'
 
     def save(self, *args, **kwargs):
         override_carto_sync = kwargs.pop('override_carto_sync', False)
-        if len(self.rawasset_set.all()) == 0: # Hide Assets that are
-            self.do_not_display = True # not linked to by RawAssets.
+        # Bulk paths can pass check_raw_assets=False and apply this rule to the whole
+        # batch afterward with flag_assets_without_raw_assets.
+        check_raw_assets = kwargs.pop('check_raw_assets', True)
+        if check_raw_assets and not self.do_not_display: # (Already-hidden Assets don't need the query.)
+            # Hide Assets that are not linked to by RawAssets (which new Assets can't be yet).
+            if self.pk is None or not self.rawasset_set.exists():
+                self.do_not_display = True
         if not override_carto_sync:
             # When saving Assets, if do_not_display changes to True, the Asset should be
             # deleted from the Carto table.
@@ -381,3 +438,152 @@ class Asset(models.Model):
         # Similar syncing could be done when changing Location instances in a way
         # that would affect Asset locations, but all the affected Assets would need
         # to be collected and updated. For now, a daily cronjob will catch these changes.
+
+
+def flag_assets_without_raw_assets(assets):
+    """Apply Asset.save()'s rule (hide Assets that are not linked to by RawAssets) to
+    a batch of saved Assets with one query. This sets do_not_display on the Assets
+    and returns the ones that changed, which the caller still needs to write."""
+    assets = [asset for asset in assets if not asset.do_not_display]
+    linked_asset_ids = set(RawAsset.objects.filter(asset_id__in=[asset.id for asset in assets])
+                           .values_list('asset_id', flat=True))
+    changed = []
+    for asset in assets:
+        if asset.id not in linked_asset_ids:
+            asset.do_not_display = True
+            changed.append(asset)
+    return changed
+
+
+class AssetIndex(models.Model):
+    """Read-only view of the asset index materialized view (see assets/asset_index.py),
+    which has one row per displayable Asset with its type, category, and location
+    already joined in."""
+    name = models.CharField(max_length=255)
+    asset_type = models.CharField(max_length=255, null=True)
+    asset_type_title = models.CharField(max_length=255, null=True)
+    category = models.CharField(max_length=255, null=True)
+    category_title = models.CharField(max_length=255, null=True)
+    sensitive = models.BooleanField(null=True)
+    location_id = models.IntegerField()
+    street_address = models.CharField(max_length=100, null=True)
+    city = models.CharField(max_length=50, null=True)
+    state = models.CharField(max_length=50, null=True)
+    zip_code = models.CharField(max_length=10, null=True)
+    geom = models.PointField()
+
+    class Meta:
+        managed = False
+        db_table = 'assets_assetindex'
+        verbose_name_plural = 'asset index'
+
+    def __str__(self):
+        return self.name or '<MISSING NAME>'
+
+
+class AssetUpdateJob(models.Model):
+    """An uploaded merge-instructions file that is validated/applied by a Huey
+    worker (see assets/updater.py) rather than inside the upload request."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('finished', 'Finished'),
+        ('failed', 'Failed'),
+    )
+    file = models.FileField(upload_to='asset_updates/')
+    using = models.CharField(max_length=20) # 'using-raw-assets' or 'using-assets'
+    mode = models.CharField(max_length=10) # 'validate' or 'update'
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.IntegerField(null=True, blank=True)
+    processed_rows = models.IntegerField(default=0)
+    submitted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def add_messages(self, texts):
+        AssetUpdateJobMessage.objects.bulk_create([AssetUpdateJobMessage(job=self, text=text) for text in texts])
+
+    def progress_key(self):
+        return f'asset_update_job:{self.id}:processed_rows'
+
+    def record_progress(self, processed_rows):
+        """Report how many rows have been processed. The rows are applied in one
+        transaction, so the count is kept in the cache (where the status page can
+        see it) until finish() saves it."""
+        cache.set(self.progress_key(), processed_rows, timeout=24 * 60 * 60)
+
+    @property
+    def progress(self):
+        """The number of rows processed so far (as far as the status page can tell)."""
+        if self.status != 'running':
+            return self.processed_rows
+        return cache.get(self.progress_key(), self.processed_rows)
+
+    def finish(self, status):
+        self.status = status
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'processed_rows', 'finished_at'])
+        cache.delete(self.progress_key())
+
+    @property
+    def done(self):
+        return self.status in ['finished', 'failed']
+
+    def __str__(self):
+        return f'{self.mode} {self.using} ({self.status}, {self.progress}/{self.total_rows} rows)'
+
+
+class AssetUpdateJobMessage(models.Model):
+    """One line of the report produced by an AssetUpdateJob."""
+    job = models.ForeignKey(AssetUpdateJob, on_delete=models.CASCADE, related_name='messages')
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['id']
+
+
+class GeocodeCacheEntry(models.Model):
+    """A remembered geocoding result (or failure) for an address. See assets/geocoding.py."""
+    normalized_address = models.CharField(max_length=500, unique=True)
+    provider = models.CharField(max_length=50)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    properties = models.TextField(null=True, blank=True) # JSON
+    succeeded = models.BooleanField(default=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'geocode cache entries'
+
+    def __str__(self):
+        return self.normalized_address
+
+
+class LocationGeography(models.Model):
+    """A precomputed Location-is-in-Geography link (one per Location per geography
+    level), maintained by assets/geographies.py."""
+    location = models.ForeignKey('Location', on_delete=models.CASCADE, related_name='geographies')
+    geography = models.ForeignKey('geo.Geography', on_delete=models.CASCADE, related_name='location_links')
+    geo_level = models.CharField(max_length=30) # A key of assets.geographies.GEOGRAPHY_LEVELS
+
+    class Meta:
+        unique_together = ('location', 'geography')
+        indexes = [models.Index(fields=['geography', 'location']),
+                   models.Index(fields=['geo_level', 'location'])]
+
+
+class GeographyAssetSummary(models.Model):
+    """How many displayable Assets of each type (and category) are in each geography,
+    precomputed from LocationGeography by assets/geographies.py so that choropleth
+    maps and community pages don't have to count Assets on every request."""
+    geo_level = models.CharField(max_length=30) # A key of assets.geographies.GEOGRAPHY_LEVELS
+    geography = models.ForeignKey('geo.Geography', on_delete=models.CASCADE, related_name='asset_summaries')
+    geo_key = models.CharField(max_length=30) # The geography's primary key at its level (the GEOID for census geographies)
+    category = models.ForeignKey('Category', on_delete=models.CASCADE, null=True)
+    asset_type = models.ForeignKey('AssetType', on_delete=models.CASCADE, null=True)
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['geo_level', 'geo_key']),
+                   models.Index(fields=['geo_level', 'category'])]
+        verbose_name_plural = 'geography asset summaries'
@@ -0,0 +1,127 @@
+"""Full-text search with typo tolerance.
+
+Searchable models have a stored search_vector (a tsvector column with a GIN index)
+built from the text that people search for, which for an Asset includes the names
+of its organization, tags and services and its address. Since that text comes from
+several tables, the vectors are computed with one set-based UPDATE per model (see
+SEARCH_DOCUMENTS), for the rows that were just saved (see assets/signals.py) and for
+all rows every night (to catch renamed tags, organizations, and so on).
+
+RankedSearchFilter matches search terms against the vector and also against
+trigram similarity on names (with pg_trgm, so that typos still find things), and
+orders the results by relevance. The trigram indexes and the pg_trgm extension
+are created by the create_search_indexes management command."""
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import filters
+
+from assets.models import Asset, AssetType, Location, Organization, RawAsset, Tag, ProvidedService, TargetPopulation
+
+SEARCH_CONFIG = 'english'
+
+# SQL expressions (in terms of the alias t for the model's table) for the document
+# that each model's search_vector is built from, keyed by model. Other apps add
+# their models with register_search_document.
+SEARCH_DOCUMENTS = {}
+
+
+def register_search_document(model, document_sql):
+    SEARCH_DOCUMENTS[model] = document_sql
+
+
+def weighted(text_sql, weight):
+    return f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({text_sql}, '')), '{weight}')"
+
+
+def address_sql(location_alias):
+    return f"concat_ws(' ', {location_alias}.street_address, {location_alias}.municipality, {location_alias}.city, {location_alias}.zip_code)"
+
+
+def names_sql(m2m_field, owner_column):
+    """A subquery that concatenates the names of the objects linked through an m2m field."""
+    through = m2m_field.remote_field.through
+    target = m2m_field.remote_field.model
+    return f"""(SELECT string_agg(x.name, ' ')
+                FROM {through._meta.db_table} link
+                JOIN {target._meta.db_table} x ON x.id = link.{m2m_field.m2m_reverse_name()}
+                WHERE link.{m2m_field.m2m_column_name()} = {owner_column})"""
+
+
+register_search_document(Location, ' || '.join([
+    weighted('t.name', 'A'),
+    weighted(address_sql('t'), 'B'),
+]))
+
+register_search_document(Asset, ' || '.join([
+    weighted('t.name', 'A'),
+    weighted(f"(SELECT o.name FROM {Organization._meta.db_table} o WHERE o.id = t.organization_id)", 'B'),
+    weighted(names_sql(Asset._meta.get_field('tags'), 't.id'), 'B'),
+    weighted(names_sql(Asset._meta.get_field('services'), 't.id'), 'B'),
+    weighted(f"(SELECT {address_sql('l')} FROM {Location._meta.db_table} l WHERE l.id = t.location_id)", 'C'),
+]))
+
+
+# Columns that are searched with icontains or istartswith (which Django turns into
+# UPPER(column::text) LIKE UPPER('%term%')) by the admin and the autocomplete
+# endpoint, so they get trigram indexes on that expression to keep searches and
+# autocompletes from scanning the tables.
+ADMIN_SEARCH_COLUMNS = [
+    (RawAsset, ['name', 'street_address', 'city', 'zip_code']),
+    (Asset, ['name']),
+    (Location, ['name']),
+    (Organization, ['name']),
+    (AssetType, ['title']),
+    (Tag, ['name']),
+    (ProvidedService, ['name']),
+    (TargetPopulation, ['name']),
+]
+
+# Columns compared with trigram similarity (the % operator) by the autocomplete
+# endpoint, in addition to the names of the models in SEARCH_DOCUMENTS.
+SIMILARITY_COLUMNS = [(Organization, 'name'), (AssetType, 'title'), (Tag, 'name'), (ProvidedService, 'name'), (TargetPopulation, 'name')]
+
+
+def create_search_indexes():
+    """Create the pg_trgm extension and the trigram indexes (the search_vector GIN
+    indexes are defined on the models)."""
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for model, column in [(model, 'name') for model in SEARCH_DOCUMENTS] + SIMILARITY_COLUMNS:
+            table = model._meta.db_table
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING GIN ({column} gin_trgm_ops)")
+        for model, columns in ADMIN_SEARCH_COLUMNS:
+            table = model._meta.db_table
+            for column in columns:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column}_upper_trgm ON {table} USING GIN ((UPPER({column}::text)) gin_trgm_ops)")
+
+
+def update_search_vectors(model, ids=None):
+    """Recompute search_vector for the given rows (or all rows) of model."""
+    table = model._meta.db_table
+    where, params = ('WHERE t.id = ANY(%s)', [list(ids)]) if ids is not None else ('', [])
+    if ids is not None and len(params[0]) == 0:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"UPDATE {table} t SET search_vector = {SEARCH_DOCUMENTS[model]} {where}", params)
+
+
+def update_all_search_vectors():
+    for model in SEARCH_DOCUMENTS:
+        update_search_vectors(model)
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """A replacement for SearchFilter that uses the model's search_vector (plus
+    trigram similarity on name, for misspellings) and orders results by relevance
+    instead of filtering with ILIKE '%term%' on each of search_fields."""
+    similarity_field = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        query = SearchQuery(terms, config=SEARCH_CONFIG)
+        return queryset.filter(Q(search_vector=query) | Q(**{f'{self.similarity_field}__trigram_similar': terms})) \
+            .annotate(search_rank=SearchRank(F('search_vector'), query) + TrigramSimilarity(self.similarity_field, terms)) \
+            .order_by('-search_rank', 'id')
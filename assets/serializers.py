@@ -11,7 +11,8 @@ from assets.models import (
     Organization,
     ProvidedService,
     TargetPopulation,
-    DataSource, Category
+    DataSource, Category,
+    AssetIndex,
 )
 
 
@@ -149,3 +150,23 @@ class AssetGeoJsonSerializer(GeoFeatureModelSerializer):
             'name',
             'asset_types'
         ]
+
+
+class AssetIndexSerializer(GeoFeatureModelSerializer):
+    class Meta:
+        model = AssetIndex
+        geo_field = 'geom'
+        fields = [
+            'id',
+            'name',
+            'asset_type',
+            'asset_type_title',
+            'category',
+            'category_title',
+            'sensitive',
+            'location_id',
+            'street_address',
+            'city',
+            'state',
+            'zip_code',
+        ]
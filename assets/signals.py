@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from assets.models import Asset, AssetType, Category, Location
+from geo.signals import geographies_loaded
+from assets.geographies import GEOGRAPHY_LEVELS, refresh_location_geographies, refresh_geography_asset_summaries
+from assets.tasks import schedule_asset_index_refresh, schedule_geography_summary_refresh, \
+    schedule_location_geographies_refresh, schedule_search_vector_update
+
+
+@receiver(m2m_changed, sender=Asset.asset_types.through)
+def update_primary_asset_type(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Asset.primary_asset_type/primary_category in sync with the asset_types links."""
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    transaction.on_commit(schedule_asset_index_refresh)
+    transaction.on_commit(schedule_geography_summary_refresh)
+    if not reverse:
+        instance.refresh_primary_asset_type()
+        return
+    # The links were changed from the AssetType side (e.g., asset_type.asset_set.add(...)),
+    # so pk_set holds Asset ids (or is None for a clear, in which case we don't know which
+    # Assets were affected and have to fall back to the ones pointing at this AssetType).
+    if pk_set is None:
+        assets = Asset.objects.filter(primary_asset_type=instance)
+    else:
+        assets = Asset.objects.filter(pk__in=pk_set)
+    for asset in assets:
+        asset.refresh_primary_asset_type()
+
+
+@receiver(post_save, sender=AssetType)
+def update_primary_category(sender, instance, created, raw=False, **kwargs):
+    """If an AssetType is moved to a different Category, carry that over to the
+    denormalized primary_category of the Assets that use it."""
+    if created or raw:
+        return
+    Asset.objects.filter(primary_asset_type=instance) \
+        .exclude(primary_category_id=instance.category_id) \
+        .update(primary_category=instance.category)
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=AssetType)
+@receiver(post_save, sender=Category)
+def refresh_asset_index_after_change(sender, raw=False, **kwargs):
+    """Anything that changes what appears in the asset index schedules a (debounced)
+    refresh of the materialized view once the current transaction commits. The same
+    changes affect the per-geography Asset counts."""
+    if raw:
+        return
+    transaction.on_commit(schedule_asset_index_refresh)
+    transaction.on_commit(schedule_geography_summary_refresh)
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Location)
+def update_search_vector_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_search_vector_update(sender, [instance.id])
+
+
+@receiver(m2m_changed, sender=Asset.tags.through)
+@receiver(m2m_changed, sender=Asset.services.through)
+def update_search_vectors_after_links_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tag and service names are part of Assets' search documents."""
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if not reverse:
+        schedule_search_vector_update(Asset, [instance.id])
+    elif pk_set is not None:
+        schedule_search_vector_update(Asset, pk_set)
+    # (A Tag or ProvidedService having all its links cleared is caught by the nightly update.)
+
+
+@receiver(post_save, sender=Location)
+def refresh_geographies_after_location_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Recompute which geographies a Location is in when its geom changed (in one
+    debounced batch with the other Locations saved around the same time)."""
+    if raw or (update_fields is not None and 'geom' not in update_fields):
+        return
+    if not created and hasattr(instance, '_loaded_geom') and instance._loaded_geom == instance.geom:
+        return
+    instance._loaded_geom = instance.geom
+    location_id = instance.id
+    transaction.on_commit(lambda: schedule_location_geographies_refresh([location_id]))
+
+
+@receiver(geographies_loaded)
+def refresh_geographies_after_load(sender, levels, **kwargs):
+    """Reassign Locations to the geographies of the levels that were just reloaded."""
+    levels = [level for level in levels if level in GEOGRAPHY_LEVELS]
+    if levels:
+        refresh_location_geographies(levels=levels)
+        refresh_geography_asset_summaries(levels=levels)
@@ -0,0 +1,82 @@
+"""Vectorized distance calculations and nearest-neighbor queries over Location
+coordinates, so that consistency checks and duplicate detection can be run over
+the whole dataset at once rather than one pair of points at a time.
+
+Distances are great-circle (haversine) distances in feet."""
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS = 20.902*1000*1000 # in feet
+
+def haversine_distances(lat1, long1, lat2, long2):
+    """Return the distances (in feet) between the points (lat1, long1) and
+    (lat2, long2). The arguments can be scalars or arrays (which are broadcast
+    against each other, so one point can be compared to many)."""
+    lat1, long1, lat2, long2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, long1, lat2, long2))
+    a = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((long2 - long1)/2)**2
+    # Unlike the arccos formula, this is well-conditioned for small distances, and
+    # clipping guards against rounding pushing a slightly above 1.
+    return 2*EARTH_RADIUS*np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def to_unit_vectors(lats, longs):
+    lats, longs = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(longs, dtype=float))
+    return np.column_stack([np.cos(lats)*np.cos(longs), np.cos(lats)*np.sin(longs), np.sin(lats)])
+
+def feet_to_chord(feet):
+    # The straight-line distance through the (unit) sphere between two points that
+    # are this far apart on the surface.
+    return 2*np.sin(np.asarray(feet, dtype=float)/(2*EARTH_RADIUS))
+
+def chord_to_feet(chord):
+    return 2*EARTH_RADIUS*np.arcsin(np.clip(np.asarray(chord, dtype=float)/2, 0.0, 1.0))
+
+
+class LocationIndex:
+    """A KD-tree over points on the sphere (stored as 3D unit vectors, so that
+    Euclidean distances in the tree correspond directly to great-circle distances).
+
+    Example:
+        index = LocationIndex.from_locations(Location.objects.all())
+        distances, ids = index.nearest(40.44, -79.99, k=5)
+        ids = index.within(40.44, -79.99, 100) # Within 100 feet
+        pairs = index.pairs_within(30) # All pairs of Locations within 30 feet of each other
+    """
+    def __init__(self, ids, lats, longs):
+        self.ids = np.asarray(ids)
+        self.lats = np.asarray(lats, dtype=float)
+        self.longs = np.asarray(longs, dtype=float)
+        self.tree = cKDTree(to_unit_vectors(self.lats, self.longs))
+
+    @classmethod
+    def from_locations(cls, locations):
+        """Build the index from a Location queryset (skipping ungeocoded Locations)."""
+        rows = list(locations.filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'latitude', 'longitude'))
+        if len(rows) == 0:
+            return cls([], [], [])
+        ids, lats, longs = zip(*rows)
+        return cls(ids, lats, longs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, lat, long, k=1):
+        """Return (distances in feet, ids) of the k indexed points nearest to (lat, long)."""
+        k = min(k, len(self))
+        if k == 0:
+            return np.array([]), self.ids[:0]
+        chords, positions = self.tree.query(to_unit_vectors([lat], [long])[0], k=k)
+        chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+        return chord_to_feet(chords), self.ids[positions]
+
+    def within(self, lat, long, radius):
+        """Return the ids of the indexed points within radius feet of (lat, long)."""
+        positions = self.tree.query_ball_point(to_unit_vectors([lat], [long])[0], float(feet_to_chord(radius)))
+        return self.ids[sorted(positions)]
+
+    def pairs_within(self, radius):
+        """Return an (n, 2) array of the positions (in self.ids) of all pairs of
+        indexed points that are within radius feet of each other."""
+        if len(self) == 0:
+            return np.empty((0, 2), dtype=int)
+        return self.tree.query_pairs(float(feet_to_chord(radius)), output_type='ndarray')
@@ -1,11 +1,138 @@
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from huey import crontab
 from huey.contrib.djhuey import periodic_task, task
-from assets.models import Asset
+from assets.models import Asset, AssetUpdateJob
 from assets.util_carto import sync_asset_to_carto
+from assets.asset_index import refresh_asset_index
+from assets.geographies import refresh_location_geographies, refresh_geography_asset_summaries
+from assets.search import update_search_vectors, update_all_search_vectors
+
+REFRESH_DELAY = 60 # seconds to wait (collecting more changes) before refreshing derived tables
+
+def schedule_once(key, scheduled_task, delay=REFRESH_DELAY, args=()):
+    """Schedule scheduled_task to run in delay seconds unless a run is already pending.
+
+    This lets a burst of saves (e.g., from the Asset Updater) trigger one refresh
+    rather than one per save. The task should delete the key when it starts."""
+    if cache.add(key, True, timeout=delay * 10):
+        scheduled_task.schedule(args=args, delay=delay)
+
+def add_to_batch(key, ids, scheduled_task, delay=REFRESH_DELAY, args=()):
+    """Add ids to the batch collected under key and schedule_once scheduled_task, which
+    should get the whole batch with take_batch(key). This way a burst of saves makes
+    one task that handles all of their ids, rather than one task per save.
+
+    The cache can't append to a list atomically, so each call stores its ids under
+    the next number from a counter (cache.incr is atomic)."""
+    ids = list(ids)
+    if not ids:
+        return
+    cache.add(f'{key}:count', 0, timeout=None)
+    number = cache.incr(f'{key}:count')
+    cache.set(f'{key}:{number}', ids, timeout=delay * 10)
+    schedule_once(key, scheduled_task, delay, args)
+
+def take_batch(key):
+    """Return (and forget) the ids collected under key by add_to_batch. Any ids lost to
+    a race or to cache eviction are picked up by the nightly tasks."""
+    cache.delete(key) # (So that ids added from now on schedule another run.)
+    count = cache.get(f'{key}:count', 0)
+    taken = cache.get(f'{key}:taken', 0)
+    if taken > count: # The counter was evicted and started over.
+        taken = 0
+    numbered_keys = [f'{key}:{number}' for number in range(taken + 1, count + 1)]
+    ids = set()
+    for batch in cache.get_many(numbered_keys).values():
+        ids.update(batch)
+    cache.delete_many(numbered_keys)
+    cache.set(f'{key}:taken', count, timeout=None)
+    return sorted(ids)
 
 @task()
 def sync_assets_to_carto_eventually(asset_ids):
     pushed = 0
     for asset_id in asset_ids:
-        asset = Asset.objects.get(pk = asset_id)
+        asset = Asset.objects.select_related('primary_asset_type', 'primary_category', 'location').get(pk = asset_id)
         pushed, _ = sync_asset_to_carto(asset, [asset_id], pushed, [], records_per_request=1)
     print(f"Pushed {pushed} Assets to Carto.")
+
+ASSET_INDEX_REFRESH_KEY = 'asset-index-refresh-pending'
+
+@task()
+def refresh_asset_index_eventually():
+    cache.delete(ASSET_INDEX_REFRESH_KEY)
+    refresh_asset_index()
+
+def schedule_asset_index_refresh():
+    schedule_once(ASSET_INDEX_REFRESH_KEY, refresh_asset_index_eventually)
+
+@periodic_task(crontab(hour='5', minute='0'))
+def refresh_asset_index_nightly():
+    # Bulk edits (queryset updates and bulk_update calls) don't send the signals that
+    # trigger refresh_asset_index_eventually, so also refresh once a day.
+    refresh_asset_index()
+
+@task()
+def process_asset_update_job(job_id):
+    from assets.updater import run_update_job # Imported here because assets.updater imports this module.
+    run_update_job(AssetUpdateJob.objects.get(pk = job_id))
+
+LOCATION_GEOGRAPHIES_REFRESH_KEY = 'location-geographies-refresh-pending'
+
+@task()
+def refresh_location_geographies_eventually():
+    location_ids = take_batch(LOCATION_GEOGRAPHIES_REFRESH_KEY)
+    if location_ids:
+        refresh_location_geographies(location_ids)
+        # Moving Locations between geographies changes the per-geography counts.
+        schedule_geography_summary_refresh()
+
+def schedule_location_geographies_refresh(location_ids):
+    add_to_batch(LOCATION_GEOGRAPHIES_REFRESH_KEY, location_ids, refresh_location_geographies_eventually)
+
+@periodic_task(crontab(hour='4', minute='30'))
+def refresh_location_geographies_nightly():
+    # This catches Locations changed by bulk edits (which don't send signals) and
+    # changes to the geography boundaries themselves.
+    refresh_location_geographies()
+
+GEOGRAPHY_SUMMARY_REFRESH_KEY = 'geography-summary-refresh-pending'
+
+@task()
+def refresh_geography_summaries_eventually():
+    cache.delete(GEOGRAPHY_SUMMARY_REFRESH_KEY)
+    refresh_geography_asset_summaries()
+
+def schedule_geography_summary_refresh():
+    schedule_once(GEOGRAPHY_SUMMARY_REFRESH_KEY, refresh_geography_summaries_eventually)
+
+@periodic_task(crontab(hour='4', minute='45'))
+def refresh_geography_summaries_nightly():
+    # Runs after refresh_location_geographies_nightly (and, like it, catches bulk edits).
+    refresh_geography_asset_summaries()
+
+SEARCH_VECTOR_UPDATE_DELAY = 10 # seconds (shorter than REFRESH_DELAY, since editors search for what they just saved)
+
+def search_vector_update_key(model_label):
+    return f'search-vector-update-pending:{model_label}'
+
+@task()
+def update_search_vectors_eventually(model_label):
+    ids = take_batch(search_vector_update_key(model_label))
+    if ids:
+        update_search_vectors(apps.get_model(model_label), ids)
+
+def schedule_search_vector_update(model, ids):
+    """Once the current transaction commits, add the given rows to the (debounced) batch
+    of rows of their model whose search vectors need updating."""
+    ids, model_label = list(ids), model._meta.label
+    transaction.on_commit(lambda: add_to_batch(search_vector_update_key(model_label), ids, update_search_vectors_eventually,
+                                               delay=SEARCH_VECTOR_UPDATE_DELAY, args=(model_label,)))
+
+@periodic_task(crontab(hour='5', minute='15'))
+def update_search_vectors_nightly():
+    # Renaming a Tag, Organization, etc. changes the search documents of the rows
+    # that use it without saving them.
+    update_all_search_vectors()
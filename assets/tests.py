@@ -1,3 +1,507 @@
-from django.test import TestCase
+import csv
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from assets import geocoders, tasks, updater
+from assets.asset_index import refresh_asset_index
+from assets.geocoders import GeocoderBackend, LocalBackend, register_backend
+from assets.geocoding import geocode_address_with_cache, geocode_batch
+from assets.history import bulk_history, collapse_noop_history, history_changes, prune_old_history
+from assets.management.commands.regeocode_locations import regeocode_locations
+from assets.models import Asset, AssetIndex, AssetType, AssetUpdateJob, Category, GeocodeCacheEntry, Location, RawAsset, Tag, \
+    flag_assets_without_raw_assets
+from assets.spatial import LocationIndex, haversine_distances
+from assets.utils import distance, normalize_address
+
+
+class PrimaryAssetTypeTestCase(TestCase):
+    def setUp(self):
+        self.services = Category.objects.create(name='services', title='Services')
+        self.library = AssetType.objects.create(name='library', title='Library', category=self.services)
+        self.park = AssetType.objects.create(name='park', title='Park')
+        self.asset = Asset(name='Library')
+        self.asset.save(override_carto_sync=True)
+
+    def primary(self):
+        asset = Asset.objects.get(pk=self.asset.pk)
+        return asset.primary_asset_type, asset.primary_category
+
+    def test_the_first_linked_type_is_primary(self):
+        self.asset.asset_types.add(self.library)
+        self.asset.asset_types.add(self.park)
+        self.assertEqual(self.primary(), (self.library, self.services))
+        self.asset.asset_types.remove(self.library)
+        self.assertEqual(self.primary(), (self.park, None))
+        self.asset.asset_types.clear()
+        self.assertEqual(self.primary(), (None, None))
+
+    def test_links_made_from_the_asset_type_side_count(self):
+        self.library.asset_set.add(self.asset)
+        self.assertEqual(self.primary(), (self.library, self.services))
+        self.library.asset_set.clear()
+        self.assertEqual(self.primary(), (None, None))
+
+    def test_recategorizing_an_asset_type_carries_over(self):
+        self.asset.asset_types.add(self.library)
+        recreation = Category.objects.create(name='recreation', title='Recreation')
+        self.library.category = recreation
+        self.library.save()
+        self.assertEqual(self.primary(), (self.library, recreation))
+        self.assertEqual(Asset.objects.get(pk=self.asset.pk).category, recreation)
+
+
+class RawAssetCheckTestCase(TestCase):
+    def setUp(self):
+        self.linked, self.unlinked = Asset(name='Linked'), Asset(name='Unlinked')
+        for asset in [self.linked, self.unlinked]:
+            asset.save(override_carto_sync=True)
+        RawAsset.objects.create(name='Linked', asset=self.linked)
+        Asset.objects.update(do_not_display=False)
+        self.linked.do_not_display = self.unlinked.do_not_display = False
+
+    def test_save_hides_unlinked_assets(self):
+        self.linked.save(override_carto_sync=True)
+        self.unlinked.save(override_carto_sync=True)
+        self.assertEqual((self.linked.do_not_display, self.unlinked.do_not_display), (False, True))
+        self.unlinked.do_not_display = False
+        self.unlinked.save(override_carto_sync=True, check_raw_assets=False)
+        self.assertFalse(Asset.objects.get(pk=self.unlinked.pk).do_not_display)
+
+    def test_batches_are_checked_with_one_query(self):
+        with self.assertNumQueries(1):
+            changed = flag_assets_without_raw_assets([self.linked, self.unlinked])
+        self.assertEqual(changed, [self.unlinked])
+        self.assertEqual((self.linked.do_not_display, self.unlinked.do_not_display), (False, True))
+
+
+class AssetIndexTestCase(TestCase):
+    def setUp(self):
+        library = AssetType.objects.create(name='library', title='Library',
+                                           category=Category.objects.create(name='services', title='Services'))
+        location = Location.objects.create(street_address='1 Main St', city='Pittsburgh', state='PA',
+                                           latitude=40.44, longitude=-79.95)
+        self.asset = Asset(name='Library', location=location)
+        self.asset.save(override_carto_sync=True)
+        self.asset.asset_types.add(library)
+        RawAsset.objects.create(name='Library', asset=self.asset)
+        self.asset.do_not_display = False # (The first save hid it, since nothing linked to it yet.)
+        self.asset.save(override_carto_sync=True)
+
+    def test_refreshing_picks_up_changes(self):
+        refresh_asset_index()
+        entry = AssetIndex.objects.get(pk=self.asset.pk)
+        self.assertEqual((entry.name, entry.asset_type, entry.category, entry.city), ('Library', 'library', 'services', 'Pittsburgh'))
+
+        self.asset.do_not_display = True
+        self.asset.save(override_carto_sync=True)
+        self.assertTrue(AssetIndex.objects.filter(pk=self.asset.pk).exists()) # (Until the next refresh.)
+        refresh_asset_index()
+        self.assertFalse(AssetIndex.objects.filter(pk=self.asset.pk).exists())
+
+    def test_saves_schedule_a_refresh(self):
+        with patch('django.db.transaction.on_commit', lambda callback: callback()), \
+                patch('assets.signals.schedule_asset_index_refresh') as schedule:
+            self.asset.name = 'Branch Library'
+            self.asset.save(override_carto_sync=True)
+        self.assertTrue(schedule.called)
+
+
+class SpatialTestCase(TestCase):
+    def test_distances(self):
+        self.assertAlmostEqual(distance(40.44, -79.95, 40.4401, -79.95), 36.48, places=1)
+        self.assertIsNone(distance(40.44, -79.95, '', -79.95))
+        self.assertEqual(list(haversine_distances(40.44, -79.95, [40.44, 40.4401], [-79.95, -79.95]).round(1)), [0.0, 36.5])
+
+    def test_location_index(self):
+        index = LocationIndex([1, 2, 3], [40.44, 40.4401, 40.45], [-79.95, -79.95, -79.95])
+        distances, ids = index.nearest(40.44, -79.95, k=2)
+        self.assertEqual(list(ids), [1, 2])
+        self.assertAlmostEqual(distances[1], 36.48, places=1)
+        self.assertEqual(list(index.within(40.44, -79.95, 40)), [1, 2])
+        self.assertEqual([sorted(index.ids[pair]) for pair in index.pairs_within(40)], [[1, 2]])
+
+    def test_ungeocoded_locations_are_left_out(self):
+        geocoded = Location.objects.create(name='Geocoded', latitude=40.44, longitude=-79.95)
+        Location.objects.create(name='Ungeocoded')
+        self.assertEqual(list(LocationIndex.from_locations(Location.objects.all()).ids), [geocoded.id])
+        self.assertEqual(len(LocationIndex.from_locations(Location.objects.none())), 0)
+
+
+class FlagIffyGeocodingTestCase(TestCase):
+    def location_with_asset(self, **kwargs):
+        location = Location.objects.create(**kwargs)
+        asset = Asset(name=location.street_address, location=location)
+        asset.save(override_carto_sync=True)
+        Asset.objects.filter(pk=asset.pk).update(do_not_display=False) # (As if a RawAsset linked to it.)
+        return location
+
+    def test_suspicious_locations_are_flagged(self):
+        nearby = self.location_with_asset(street_address='1 Main St', zip_code='15213', latitude=40.44, longitude=-79.95)
+        reviewed = self.location_with_asset(street_address='3 Main St', zip_code='15213', latitude=40.44002, longitude=-79.95,
+                                            iffy_geocoding=False)
+        faraway = self.location_with_asset(street_address='5 Main St', zip_code='15213', latitude=40.45, longitude=-79.95)
+        with_unit = Location.objects.create(street_address='10 Oak Ave', unit='2', zip_code='15217')
+        without_unit = Location.objects.create(street_address='10 Oak Avenue', zip_code='15217-1234')
+        output = tempfile.NamedTemporaryFile(suffix='.csv')
+        call_command('flag_iffy_geocoding', radius=30, output=output.name)
+
+        flagged = set(Location.objects.filter(iffy_geocoding=True).values_list('id', flat=True))
+        self.assertEqual(flagged, {nearby.id, without_unit.id})
+        Location.objects.get(pk=reviewed.pk, iffy_geocoding=False) # (A reviewer's decision isn't overridden.)
+        with open(output.name) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual({int(row['location_id']) for row in rows}, {nearby.id, reviewed.id, with_unit.id, without_unit.id})
+        self.assertNotIn(faraway.id, flagged)
+
+    def test_dry_runs_change_nothing(self):
+        self.location_with_asset(street_address='1 Main St', zip_code='15213', latitude=40.44, longitude=-79.95)
+        self.location_with_asset(street_address='3 Main St', zip_code='15213', latitude=40.44002, longitude=-79.95)
+        output = tempfile.NamedTemporaryFile(suffix='.csv')
+        call_command('flag_iffy_geocoding', radius=30, output=output.name, dry_run=True)
+        self.assertFalse(Location.objects.filter(iffy_geocoding=True).exists())
+
+
+@register_backend
+class FakeRemoteBackend(GeocoderBackend):
+    """A remote backend for tests that answers from RESULTS (and counts its calls)."""
+    name = 'fake-remote'
+    RESULTS = {} # normalized address -> (latitude, longitude)
+    fail = False
+
+    def geocode(self, address):
+        if self.fail:
+            raise IOError("The geocoder is down.")
+        result = self.RESULTS.get(normalize_address(address))
+        if result is None:
+            return None, None, None
+        return result[0], result[1], {'geocoder': self.name}
+
+
+ADDRESS = '1 Main St, Pittsburgh, PA 15213'
+
+
+class GeocodingTestCase(TestCase):
+    def setUp(self):
+        LocalBackend.index = None
+        geocoders._instances.clear()
+        geocoders.STUB_RESULTS.clear()
+        FakeRemoteBackend.RESULTS = {normalize_address(ADDRESS): (40.44, -79.95)}
+        FakeRemoteBackend.fail = False
+
+    def remote_calls(self):
+        return geocoders._instances['fake-remote'].calls
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'])
+    def test_remote_results_are_cached(self):
+        self.assertEqual(geocode_address_with_cache(ADDRESS)[:2], (40.44, -79.95))
+        self.assertEqual(geocode_address_with_cache(ADDRESS)[:2], (40.44, -79.95))
+        self.assertEqual(self.remote_calls(), 1)
+        self.assertTrue(GeocodeCacheEntry.objects.get(normalized_address=normalize_address(ADDRESS)).succeeded)
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'])
+    def test_differently_spelled_addresses_share_an_entry(self):
+        geocode_address_with_cache(ADDRESS)
+        self.assertEqual(geocode_address_with_cache('1 MAIN STREET  Pittsburgh PA 15213')[:2], (40.44, -79.95))
+        self.assertEqual(self.remote_calls(), 1)
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'], GEOCODE_CACHE_NEGATIVE_DAYS=30)
+    def test_failures_are_cached_until_they_expire(self):
+        geocode_address_with_cache('2 Nowhere Rd')
+        geocode_address_with_cache('2 Nowhere Rd')
+        self.assertEqual(self.remote_calls(), 1)
+        GeocodeCacheEntry.objects.update(created=timezone.now() - timedelta(days=31))
+        geocode_address_with_cache('2 Nowhere Rd')
+        self.assertEqual(self.remote_calls(), 2)
+        self.assertEqual(GeocodeCacheEntry.objects.count(), 1)
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'])
+    def test_batch_uses_the_cache(self):
+        geocode_address_with_cache(ADDRESS)
+        results = geocode_batch([ADDRESS, '2 Nowhere Rd'], workers=1, rate=100)
+        self.assertEqual(results[ADDRESS][:2], (40.44, -79.95))
+        self.assertEqual(results['2 Nowhere Rd'], (None, None, None))
+        self.assertFalse(GeocodeCacheEntry.objects.get(normalized_address=normalize_address('2 Nowhere Rd')).succeeded)
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'])
+    def test_errors_are_not_cached_as_failures(self):
+        FakeRemoteBackend.fail = True
+        self.assertEqual(geocode_address_with_cache(ADDRESS), (None, None, None))
+        self.assertFalse(GeocodeCacheEntry.objects.exists())
+
+    @override_settings(GEOCODER_BACKENDS=['stub'])
+    def test_stub_results_are_never_cached(self):
+        geocoders.STUB_RESULTS[normalize_address(ADDRESS)] = (1.0, 2.0)
+        self.assertEqual(geocode_address_with_cache(ADDRESS)[:2], (1.0, 2.0))
+        geocode_address_with_cache('2 Nowhere Rd')
+        geocode_batch([ADDRESS, '3 Nowhere Rd'], workers=1, rate=100)
+        self.assertFalse(GeocodeCacheEntry.objects.exists())
+
+    @override_settings(GEOCODER_BACKENDS=['local', 'fake-remote'])
+    def test_regeocoding_skips_the_local_index(self):
+        Location.objects.create(street_address='1 Main St', city='Pittsburgh', state='PA', zip_code='15213',
+                                latitude=10.0, longitude=20.0)
+        self.assertEqual(geocode_address_with_cache(ADDRESS)[:2], (10.0, 20.0))
+        self.assertEqual(geocode_address_with_cache(ADDRESS, use_local=False)[:2], (40.44, -79.95))
+        self.assertEqual(geocode_batch([ADDRESS], workers=1, rate=100, use_local=False)[ADDRESS][:2], (40.44, -79.95))
+
+    def test_regeocoded_locations_are_scheduled_for_refreshes(self):
+        location = Location.objects.create(street_address='1 Main St', city='Pittsburgh', state='PA', zip_code='15213',
+                                           latitude=10.0, longitude=20.0)
+        command = 'assets.management.commands.regeocode_locations'
+        with patch(f'{command}.geocode_batch', lambda addresses, **kwargs: {a: (40.44, -79.95, None) for a in addresses}), \
+                patch('django.db.transaction.on_commit', lambda callback: callback()), \
+                patch(f'{command}.schedule_location_geographies_refresh') as geographies_refresh, \
+                patch(f'{command}.schedule_search_vector_update') as search_vector_update, \
+                patch(f'{command}.schedule_asset_index_refresh'):
+            regeocode_locations([location], dry_run=False, batch_size=10, workers=1, rate=100, use_cache=False)
+        location.refresh_from_db()
+        self.assertEqual((location.latitude, location.longitude), (40.44, -79.95))
+        geographies_refresh.assert_called_once_with([location.id])
+        search_vector_update.assert_called_once_with(Location, [location.id])
+
+
+class BulkHistoryTestCase(TestCase):
+    def setUp(self):
+        self.raw_assets = [RawAsset.objects.create(name=f'Library {i}') for i in range(3)]
+        self.historical_model = RawAsset.history.model
+
+    def rename_all(self):
+        for raw_asset in self.raw_assets:
+            raw_asset.name += ' (renamed)'
+            raw_asset._change_reason = 'Renaming'
+            raw_asset.save()
+
+    def test_records_are_written_at_the_end_of_the_block(self):
+        with bulk_history():
+            with bulk_history(): # (Nested blocks share the outer buffer.)
+                self.rename_all()
+            self.assertEqual(self.historical_model.objects.count(), 3)
+        self.assertEqual(self.historical_model.objects.count(), 6)
+        self.assertEqual(list(self.historical_model.objects.filter(history_change_reason='Renaming')
+                              .order_by('id').values_list('name', flat=True)),
+                         [raw_asset.name for raw_asset in self.raw_assets])
+
+    def test_records_are_written_in_batches(self):
+        with CaptureQueriesContext(connection) as context:
+            with bulk_history(batch_size=2):
+                self.rename_all()
+                self.assertEqual(self.historical_model.objects.count(), 5)
+        inserts = [q for q in context.captured_queries if q['sql'].startswith(f'INSERT INTO "{self.historical_model._meta.db_table}"')]
+        self.assertEqual(len(inserts), 2)
+
+    def test_rolled_back_saves_leave_no_history(self):
+        with transaction.atomic():
+            with bulk_history():
+                self.rename_all()
+                transaction.set_rollback(True)
+        self.assertEqual(self.historical_model.objects.count(), 3)
+
+
+class HistoryRetentionTestCase(TestCase):
+    def setUp(self):
+        self.raw_asset = RawAsset.objects.create(name='Library')
+        self.raw_asset.save() # (Only last_updated changes.)
+        self.raw_asset.name = 'Branch Library'
+        self.raw_asset.save()
+        self.historical_model = RawAsset.history.model
+
+    def test_unchanged_resaves_are_collapsed(self):
+        self.assertEqual(collapse_noop_history(self.historical_model, dry_run=True), 1)
+        self.assertEqual(self.raw_asset.history.count(), 3)
+        self.assertEqual(collapse_noop_history(self.historical_model), 1)
+        self.assertEqual([record.name for record in self.raw_asset.history.order_by('history_date')],
+                         ['Library', 'Branch Library'])
+        self.assertEqual(collapse_noop_history(self.historical_model), 0)
+
+    def test_pruning_keeps_the_latest_versions(self):
+        self.assertEqual(prune_old_history(self.historical_model, keep_versions=2), 1)
+        self.assertEqual(prune_old_history(self.historical_model, keep_days=30), 0)
+        self.assertEqual(prune_old_history(self.historical_model, keep_days=-1), 1) # (Everything is "old", but the latest is kept.)
+        self.assertEqual(self.raw_asset.history.get().name, 'Branch Library')
+
+
+class ChangeFeedTestCase(TestCase):
+    def setUp(self):
+        self.raw_asset = RawAsset.objects.create(name='Library')
+        self.raw_asset.save()
+        self.raw_asset.name = 'Branch Library'
+        self.raw_asset.save()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_changes_leave_out_ids_and_timestamps(self):
+        records = history_changes(RawAsset.history.model, object_id=self.raw_asset.id)
+        self.assertEqual([record['changes'] for record in records[:2]],
+                         [[{'field': 'name', 'old': 'Library', 'new': 'Branch Library'}], []])
+        self.assertNotIn('last_updated', [change['field'] for change in records[2]['changes']])
+        self.assertNotIn('id', [change['field'] for change in records[2]['changes']])
+
+    def test_feed_pages_through_changes(self):
+        response = self.client.get('/api/dev/assets/changes/', {'model': 'rawasset', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_feed_rejects_bad_limits(self):
+        for limit in ['0', '-5', 'lots']:
+            response = self.client.get('/api/dev/assets/changes/', {'limit': limit})
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UpdateJobTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        AssetType.objects.create(name='library', title='Library')
+        self.assets = []
+        for name in ['First', 'Second']:
+            asset = Asset(name=name)
+            asset.save(override_carto_sync=True)
+            self.assets.append(asset)
+
+    def run_job(self, asset_types):
+        lines = ['id,asset_id,ids_to_merge,name,asset_type'] + \
+            [f'{asset.id},,{asset.id},{asset.name} (renamed),{asset_type}' for asset, asset_type in zip(self.assets, asset_types)]
+        return self.run_lines(lines)
+
+    def run_lines(self, lines, chunk_size=1, using='using-assets'):
+        job = AssetUpdateJob.objects.create(file=SimpleUploadedFile('merge.csv', '\n'.join(lines).encode('utf-8')),
+                                            using=using, mode='update')
+        with patch.object(updater, 'UPDATE_JOB_CHUNK_SIZE', chunk_size), \
+                patch.object(updater, 'sync_assets_to_carto_eventually') as sync:
+            try:
+                updater.run_update_job(job)
+            finally:
+                job.refresh_from_db()
+                self.synced_ids = [asset_id for call in sync.call_args_list for asset_id in call[0][0]]
+        return job
+
+    def names(self):
+        return list(Asset.objects.filter(pk__in=[asset.id for asset in self.assets]).order_by('pk').values_list('name', flat=True))
+
+    def test_all_chunks_are_applied(self):
+        job = self.run_job(['library', 'library'])
+        self.assertEqual((job.status, job.processed_rows), ('finished', 2))
+        self.assertEqual(self.names(), ['First (renamed)', 'Second (renamed)'])
+        self.assertEqual(self.synced_ids, [asset.id for asset in self.assets])
+
+    def test_a_bad_row_in_a_later_chunk_changes_nothing(self):
+        job = self.run_job(['library', 'no-such-type'])
+        self.assertEqual((job.status, job.processed_rows), ('failed', 0))
+        self.assertEqual(self.names(), ['First', 'Second'])
+        self.assertEqual(self.synced_ids, [])
+
+    def test_a_crash_in_a_later_chunk_changes_nothing(self):
+        process_rows = updater.process_rows
+        def crash_on_second_asset(rows, mode, *args):
+            if mode == 'update' and rows[0]['id'] == str(self.assets[1].id):
+                raise IOError("The database went away.")
+            return process_rows(rows, mode, *args)
+
+        with patch.object(updater, 'process_rows', crash_on_second_asset):
+            with self.assertRaises(IOError):
+                self.run_job(['library', 'library'])
+        self.assertEqual(self.names(), ['First', 'Second'])
+        self.assertEqual(self.synced_ids, [])
+        self.assertEqual(AssetUpdateJob.objects.get().status, 'failed')
+
+    def test_progress_is_reported_through_the_cache(self):
+        job = AssetUpdateJob.objects.create(file=SimpleUploadedFile('empty.csv', b'id'), using='using-assets',
+                                            mode='update', status='running')
+        job.processed_rows = 1
+        job.record_progress(1)
+        self.assertEqual((AssetUpdateJob.objects.get().processed_rows, AssetUpdateJob.objects.get().progress), (0, 1))
+        job.finish('finished')
+        self.assertEqual(AssetUpdateJob.objects.get().progress, 1)
+        self.assertIsNone(cache.get(job.progress_key()))
+
+    def test_rows_that_edit_the_same_location_all_take_effect(self):
+        location = Location.objects.create(name='Shared', zip_code='15213')
+        for asset in self.assets:
+            asset.location = location
+            asset.save(override_carto_sync=True)
+        # Both rows are in one chunk, and each one reaches the Location through its own Asset.
+        lines = ['id,asset_id,ids_to_merge,name,asset_type,zip_code'] + \
+            [f'{asset.id},,{asset.id},{asset.name},library,{zip_code}' for asset, zip_code in zip(self.assets, ['15217', '15232'])]
+        job = self.run_lines(lines, chunk_size=2)
+        self.assertEqual(job.status, 'finished')
+        location.refresh_from_db()
+        self.assertEqual(location.zip_code, '15232')
+
+    def test_new_assets_start_out_hidden(self):
+        raw_asset = RawAsset.objects.create(name='New Library')
+        job = self.run_lines(['id,asset_id,ids_to_merge,name,asset_type', f'{raw_asset.id},,{raw_asset.id},New Library,library'],
+                             using='using-raw-assets')
+        self.assertEqual(job.status, 'finished')
+        raw_asset.refresh_from_db()
+        self.assertEqual((raw_asset.asset.name, raw_asset.asset.do_not_display), ('New Library', True))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DebouncedTaskTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_ids_are_collected_into_one_scheduled_batch(self):
+        key = tasks.LOCATION_GEOGRAPHIES_REFRESH_KEY
+        with patch.object(tasks.refresh_location_geographies_eventually, 'schedule') as schedule:
+            tasks.schedule_location_geographies_refresh([1, 2])
+            tasks.schedule_location_geographies_refresh([2, 3])
+            self.assertEqual(schedule.call_count, 1)
+            self.assertEqual(tasks.take_batch(key), [1, 2, 3])
+            self.assertEqual(tasks.take_batch(key), [])
+            tasks.schedule_location_geographies_refresh([4])
+            self.assertEqual(schedule.call_count, 2)
+            self.assertEqual(tasks.take_batch(key), [4])
+
+    def test_search_vector_updates_are_batched_per_model(self):
+        with patch('django.db.transaction.on_commit', lambda callback: callback()), \
+                patch.object(tasks.update_search_vectors_eventually, 'schedule') as schedule:
+            tasks.schedule_search_vector_update(Location, [1])
+            tasks.schedule_search_vector_update(Location, {2, 3})
+            tasks.schedule_search_vector_update(RawAsset, [1])
+        self.assertEqual([call[1]['args'] for call in schedule.call_args_list], [('assets.Location',), ('assets.RawAsset',)])
+        self.assertEqual(tasks.take_batch(tasks.search_vector_update_key('assets.Location')), [1, 2, 3])
+
+    def test_only_moved_locations_are_refreshed(self):
+        with patch('django.db.transaction.on_commit', lambda callback: callback()), \
+                patch.object(tasks, 'schedule_once'), \
+                patch('assets.signals.schedule_search_vector_update'), \
+                patch('assets.signals.schedule_location_geographies_refresh') as refresh:
+            location = Location.objects.create(street_address='1 Main St', latitude=40.44, longitude=-79.95)
+            location.save()
+            location = Location.objects.get(pk=location.pk)
+            location.street_address = '1 Main Street'
+            location.save()
+            self.assertEqual(refresh.call_count, 1)
+            location.geom = Point(-79.9, 40.4)
+            location.save()
+            location.save()
+            self.assertEqual(refresh.call_count, 2)
+            refresh.assert_called_with([location.id])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AutocompleteTestCase(TestCase):
+    def test_limits_are_clamped(self):
+        for name in ['Library', 'Library Annex']:
+            Tag.objects.create(name=name)
+        client = APIClient()
+        for limit, expected in [('-3', 1), ('0', 1), ('1', 1), ('lots', 2), ('1000', 2)]:
+            response = client.get('/api/dev/assets/autocomplete/', {'q': 'lib', 'type': 'tag', 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), expected)
@@ -0,0 +1,721 @@
+"""The Asset Updater: applies a merge-instructions CSV file (either validating it or
+actually updating Assets, RawAssets, Locations, and Organizations)."""
+import csv
+
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from assets.history import bulk_history
+from assets.models import RawAsset, Asset, AssetType, Tag, TargetPopulation, ProvidedService, Location, Organization, \
+    flag_assets_without_raw_assets
+from assets.management.commands.util import standardize_phone
+from assets.utils import distance
+from assets.tasks import sync_assets_to_carto_eventually, schedule_asset_index_refresh, schedule_geography_summary_refresh, \
+    schedule_location_geographies_refresh, schedule_search_vector_update
+
+def there_is_a_field_to_update(row, fields_to_check):
+    """Scan record for certain fields and see if any exist
+    and are non-null (meaning that a Location could be
+    created."""
+    update_is_needed = False
+    for field in fields_to_check:
+        if field in row and row[field] not in ['', None]:
+            return True
+    return update_is_needed
+
+def boolify(x): # This differs from the assets.management.commands.util versiion of boolify.
+    if x.lower() in ['true', 't']:
+        return True
+    if x.lower() in ['false', 'f']:
+        return False
+    return None
+
+def eliminate_empty_strings(xs):
+    return [x for x in xs if x != '']
+
+def non_blank_type_or_none(row, field, desired_type): # This could be imported from elsewhere.
+    """This function tries to cast the value of row[field] to
+    the passed desired type (e.g, float or int). If it fails,
+    or if the passed value is an empty string (which is how
+    None values are passed by CSVs), it returns None.
+
+    Note that this does not yet support fields like
+    PhoneNumberField, URLField, and EmailField."""
+    if field in row:
+        if row[field] == '':
+            return None
+        if desired_type == bool:
+            return boolify(row[field])
+        try:
+            return desired_type(row[field])
+        except ValueError:
+            if desired_type == int:
+                try:
+                    return int(float(row[field])) # This is necessary to handle
+                    # cases where Excel obliviously appends ".0" to integers.
+                except ValueError:
+                    return None
+            return None
+    return None
+
+def pipe_delimit(xs):
+    return '|'.join([str(x) for x in xs])
+
+def list_of(named_things):
+    # This converts ManyToManyField values back to a list.
+    return [t.name for t in named_things.all()]
+
+def check_or_update_value(instance, row, mode, more_results, source_field_name, field_type=str):
+    if source_field_name not in row:
+        return instance, more_results
+    new_value = non_blank_type_or_none(row, source_field_name, field_type)
+
+    old_value = getattr(instance, source_field_name)
+    if new_value != old_value:
+        more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+        setattr(instance, source_field_name, new_value)
+    return instance, more_results
+
+
+def ids_in(value):
+    """Parse an id field like '12' or a merge field like '12+345' into a list of
+    integer ids. Raises ValueError if any of the ids is not an integer."""
+    if value in ['', None]:
+        return []
+    return [int(i) for i in value.split('+')]
+
+class UpdateLookups:
+    """All the Assets, RawAssets, Locations, Organizations, and AssetTypes referenced
+    by a batch of merge-instructions rows, each fetched with a single query (rather
+    than the several queries per row that looking them up one at a time takes).
+    The same instances are used for validating the rows and then updating them."""
+    def __init__(self, rows, using):
+        asset_ids, raw_asset_ids, location_ids, organization_ids = set(), set(), set(), set()
+        asset_type_names = set()
+
+        def collect(ids, value):
+            try:
+                ids.update(ids_in(value))
+            except ValueError: # validate_rows reports these.
+                pass
+
+        for row in rows:
+            if using == 'using-assets':
+                collect(asset_ids, row.get('id'))
+                collect(asset_ids, row.get('ids_to_merge'))
+            else:
+                collect(raw_asset_ids, row.get('id'))
+                collect(raw_asset_ids, row.get('ids_to_merge'))
+                collect(asset_ids, row.get('asset_id'))
+            if row.get('location_id') != 'new':
+                collect(location_ids, row.get('location_id'))
+            if row.get('organization_id') != 'new':
+                collect(organization_ids, row.get('organization_id'))
+            collect(location_ids, row.get('parent_location_id'))
+            asset_type_names.update(eliminate_empty_strings(row.get('asset_type', '').split('|')))
+
+        assets = Asset.objects.prefetch_related('asset_types', 'tags', 'services', 'hard_to_count_population')
+        if using == 'using-assets': # The RawAssets of merged Assets get reassigned.
+            assets = assets.prefetch_related('rawasset_set')
+        self.assets = assets.in_bulk(asset_ids)
+        self.raw_assets = RawAsset.objects.in_bulk(raw_asset_ids)
+
+        # The Assets' Locations and Organizations (and the Locations' parents) are looked up
+        # along with the ones named in the rows and then linked up, so that there's only one
+        # instance of each database row, however a row of the file reaches it. (With separate
+        # copies, the edits made through one copy would be overwritten by the other.)
+        location_ids.update(asset.location_id for asset in self.assets.values() if asset.location_id is not None)
+        organization_ids.update(asset.organization_id for asset in self.assets.values() if asset.organization_id is not None)
+        self.locations = Location.objects.in_bulk(location_ids)
+        parent_ids = {location.parent_location_id for location in self.locations.values()} - set(self.locations) - {None}
+        self.locations.update(Location.objects.in_bulk(parent_ids))
+        self.organizations = Organization.objects.in_bulk(organization_ids)
+        for location in self.locations.values():
+            if location.parent_location_id in self.locations:
+                location.parent_location = self.locations[location.parent_location_id]
+        for asset in self.assets.values():
+            if asset.location_id is not None:
+                asset.location = self.locations[asset.location_id]
+            if asset.organization_id is not None:
+                asset.organization = self.organizations[asset.organization_id]
+        # AssetType.name is not a unique field, so in_bulk(field_name='name') can't be used.
+        self.asset_types = {t.name: t for t in AssetType.objects.filter(name__in=asset_type_names)}
+
+    def missing(self, found, value):
+        return [i for i in ids_in(value) if i not in found]
+
+
+class PendingWrites:
+    """Changes to existing instances that the Asset Updater has accumulated, so that
+    they can be written with one bulk_update (and one bulk insert of history
+    records) per model instead of one or more save() calls per row."""
+    def __init__(self):
+        # Keyed by primary key (new instances are saved before they get here). The
+        # lookups hand out one instance per row, so each key only ever has one instance.
+        self.assets = {}
+        self.raw_assets = {}
+        self.locations = {}
+        self.organizations = {}
+        self.m2m_changes = []
+
+    def update(self, instance):
+        pending = {Asset: self.assets, RawAsset: self.raw_assets,
+                Location: self.locations, Organization: self.organizations}[type(instance)]
+        pending[instance.pk] = instance
+
+    def set_m2m(self, asset, field_name, values):
+        self.m2m_changes.append((asset, field_name, values))
+
+    def flush(self):
+        locations = list(self.locations.values())
+        for location in locations:
+            location.fill_in_name_and_geom()
+        bulk_update_with_history(locations, Location, fields_to_update(Location, exclude=['search_vector']), batch_size=500)
+        bulk_update_with_history(list(self.organizations.values()), Organization, fields_to_update(Organization), batch_size=500)
+
+        raw_assets = list(self.raw_assets.values())
+        bulk_update_with_history(raw_assets, RawAsset, ['asset'], batch_size=500)
+
+        for asset, field_name, values in self.m2m_changes:
+            getattr(asset, field_name).set(values)
+
+        assets = list(self.assets.values())
+        flag_assets_without_raw_assets(assets) # (What Asset.save() would do.)
+        now = timezone.now()
+        for asset in assets:
+            asset.last_updated = now # (auto_now is only applied by save().)
+        bulk_update_with_history(assets, Asset, fields_to_update(Asset, exclude=['date_entered', 'primary_asset_type', 'primary_category', 'search_vector']), batch_size=500)
+
+        if len(assets) > 0 or len(locations) > 0:
+            # Bulk updates don't send the signals that would otherwise do this.
+            transaction.on_commit(schedule_asset_index_refresh)
+            transaction.on_commit(schedule_geography_summary_refresh)
+        if len(locations) > 0:
+            location_ids = [l.id for l in locations]
+            transaction.on_commit(lambda: schedule_location_geographies_refresh(location_ids))
+            schedule_search_vector_update(Location, location_ids)
+        if len(assets) > 0:
+            schedule_search_vector_update(Asset, [a.id for a in assets])
+
+def fields_to_update(model, exclude=[]):
+    return [f.name for f in model._meta.concrete_fields if not f.primary_key and f.name not in exclude]
+
+def modify_destination_asset(mode, row, destination_asset, created_new_asset, more_results, lookups, pending):
+    error = False
+    if 'location_id' in row:
+        location_id = row['location_id']
+        if location_id in ['', None, 'new']:
+            # Create a new Location instance to be populated.
+            location = None # Location creation happens below.
+        else:
+            location = lookups.locations[int(location_id)]
+    else: # If the location_id field is omitted from the merge instructions,
+        # fall back to the destination asset's location (which may be None).
+        location = destination_asset.location
+
+    # I'm choosing to not update the Location.name field here since we may want to manually name Location instances,
+    # particularly to deal with cases like the two restaurant locations in Schenley Plaza that have the same
+    # street address and parcel ID but slightly different geocoordinates.
+    if location is None:
+        if there_is_a_field_to_update(row, ['street_address', 'municipality', 'city', 'state', 'zip_code', 'parcel_id', 'latitude', 'longitude']):
+            if mode == 'update':
+                more_results.append(f"Creating a new Location for this Asset.")
+            else:
+                more_results.append(f"A new Location would be created for this Asset.")
+            location = Location()
+        elif there_is_a_field_to_update(row, ['residence', 'iffy_geocoding', 'unit', 'unit_type', 'available_transportation', 'geocoding_properties']):
+            more_results.append("There is not enough information to create a new location for this Asset, but there are fields in the merge-instructions file which need to be assigned to a Location. Does not compute! ABORTING!!!<hr>")
+            return None, None, None, more_results, True
+
+    if 'organization_id' in row:
+        organization_id = row['organization_id']
+        if organization_id in ['', None, 'new']:
+            # Create a new Organization instance to be populated.
+            organization = None # Organization creation happens below.
+        else:
+            organization = lookups.organizations[int(organization_id)]
+    else: # If the organization_id field is omitted from the merge instructions,
+        # fall back to the destination asset's organization (which may be None).
+        organization = destination_asset.organization
+
+
+    asset_name = row['name']
+    if asset_name != destination_asset.name:
+        more_results.append(f"asset_name {'will be ' if mode == 'validate' else ''}changed from {destination_asset.name} to {asset_name}.")
+        destination_asset.name = asset_name
+
+    # [ ] Oddball legacy conversion to be deleted:
+    source_field_name = 'accessibility_features'
+    if source_field_name in row:
+        new_value = boolify(row[source_field_name])
+        old_value = destination_asset.accessibility
+        if new_value != old_value:
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+            destination_asset.accessibility = new_value
+
+
+    missing_organization_identifier = True
+    if 'organization_name' in row and row['organization_name'] not in ['', None]:
+        missing_organization_identifier = False
+    elif 'organization_id' in row and row['organization_id'] not in ['', None]:
+        missing_organization_identifier = False
+    # Which is about the same as what I originally wrote:
+    #   missing_organization_identifier = (('organization_name' not in row) or (row['organization_name'] == '')) and (('organization_id' not in row) or (row['organization_id'] == ''))
+    # but whatever.
+
+    if missing_organization_identifier:
+        # The organization can be identified EITHER by the organization_id value or by the organization_name value.
+        if ('organization_phone' in row and row['organization_phone'] != '') or ('organization_email' in row and row['organization_email'] != ''):
+            more_results.append(f"The organization's name or ID value is required if you want to change either the phone or e-mail address (as a check that the correct Organization instance is being updated. ABORTING!!!!\n<hr>.")
+            return None, None, None, more_results, True
+        #else: This is being removed for now since it seems like it could accidentally delete extant organizations.
+        #    destination_asset.organization = None # Set ForiegnKey to None.
+        #    more_results.append(f"&nbsp;&nbsp;&nbsp;&nbsp;Since the organization has not been clearly identified by name or ID, the Asset's organization is being set to None and other fields (organization_phone and organization email) are being ignored.")
+    else:
+        if organization is None:
+            if mode == 'update':
+                more_results.append(f"Creating a new Organization for this Asset.")
+            else:
+                more_results.append(f"A new Organization would be created for this Asset.")
+            organization = Organization() # Create new organization instance.
+
+        source_field_name = 'organization_name'
+        destination_field_name = 'name'
+        new_value = non_blank_type_or_none(row, source_field_name, str)
+        old_value = organization.name
+        if new_value != old_value:
+            more_results.append(f"organization.{destination_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+            organization.name = new_value
+
+        # check_or_update_value() can not be used without adding separate handling of source_field_name and destination_field_name.
+        source_field_name = 'organization_email'
+        if source_field_name in row:
+            destination_field_name = 'email'
+            new_value = non_blank_type_or_none(row, source_field_name, str)
+            old_value = organization.email
+            if new_value != old_value:
+                more_results.append(f"organization.{destination_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+                organization.email = new_value
+
+        source_field_name = 'organization_phone'
+        if source_field_name in row:
+            new_value = standardize_phone(non_blank_type_or_none(row, source_field_name, str))
+            old_value = organization.phone
+            if new_value != old_value:
+                more_results.append(f"organization.{destination_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+                organization.phone = new_value
+
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'street_address', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'unit', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'unit_type', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'municipality', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'city', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'state', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'zip_code', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'parcel_id', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'residence', field_type=bool)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'iffy_geocoding', field_type=bool)
+
+    if 'latitude' in row or 'longitude' in row:
+        old_latitude, old_longitude = location.latitude, location.longitude
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'latitude', field_type=float)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'longitude', field_type=float)
+    if 'latitude' in row or 'longitude' in row:
+        dist = distance(old_latitude, old_longitude, location.latitude, location.longitude)
+        if dist is not None:
+            more_results.append(f"&nbsp;&nbsp;&nbsp;&nbsp;The distance between the old and new coordinates is {dist:.2f} feet.")
+
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'available_transportation', field_type=str)
+    location, more_results = check_or_update_value(location, row, mode, more_results, source_field_name = 'geocoding_properties', field_type=str)
+
+    # BEGIN Handle parent_location and parent_location_id
+    source_field_name = 'parent_location_id'
+    if source_field_name in row:
+        new_value = non_blank_type_or_none(row, source_field_name, int)
+        old_value = getattr(location, 'parent_location_id', None)
+
+        if new_value != old_value:
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+            new_parent_location = lookups.locations[new_value] if new_value is not None else None
+            setattr(location, 'parent_location', new_parent_location)
+
+    if 'parent_location' in row:
+        parent_location_name = getattr(getattr(location, 'parent_location', None), 'name', None)
+        more_results.append(f"The parent_location name (after any parent_location_id updates) {'would be' if mode == 'validate' else 'is'} {parent_location_name}. [The 'parent_location' value in the merge-instructions file is not used to make updates.]")
+    # END Handle parent_location and parent_location_id
+
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'url', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'email', field_type=str)
+    source_field_name = 'phone'
+    if source_field_name in row:
+        new_value = standardize_phone(non_blank_type_or_none(row, source_field_name, str))
+        old_value = destination_asset.phone
+        if new_value != old_value:
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {old_value} to {new_value}.")
+            destination_asset.phone = new_value
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'hours_of_operation', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'holiday_hours_of_operation', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'periodicity', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'capacity', field_type=int)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'periodicity', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'wifi_network', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'wifi_notes', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'internet_access', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'computers_available', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'accessibility', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'open_to_public', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'child_friendly', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'sensitive', field_type=bool)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'localizability', field_type=str)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'etl_notes', field_type=str)
+
+    # Unfortunately the many-to-many relations that follow can not be set on an Asset until it has been saved,
+    # so for cases where created_new_asset == True, we have to save the Asset once at this point so it has an
+    # id value.
+    if created_new_asset and mode == 'update':
+        destination_asset._change_reason = "Asset Updater: Initial save of Asset to allow many-to-many relationships"
+        destination_asset.do_not_display = True # (What save() would decide, since nothing links to a new Asset yet.)
+        destination_asset.save(override_carto_sync = created_new_asset, check_raw_assets = False)
+    destination_asset, more_results = check_or_update_value(destination_asset, row, mode, more_results, source_field_name = 'do_not_display', field_type=bool)
+    # do_not_display must be set after the destination asset is initially saved since if
+    # a new asset is created, it could be initially locationless and therefore have
+    # do_not_display auto-set to True.
+
+    source_field_name = 'asset_type'
+    new_values = eliminate_empty_strings(row[source_field_name].split('|'))
+    list_of_old_values = list_of(destination_asset.asset_types) if not created_new_asset else []
+    if set(new_values) != set(list_of_old_values):
+        more_results.append(f"asset_type {'will be ' if mode == 'validate' else ''}changed from {pipe_delimit(list_of_old_values)} to {pipe_delimit(new_values)}.")
+        if new_values == []:
+            more_results.append(f"asset_type can not be empty\n ABORTING!!!\n<hr>")
+            return None, None, None, more_results, True
+        if any(asset_type not in lookups.asset_types for asset_type in new_values):
+            # New asset types have to be created manually for now since that encourages us to specify a Category (necessary for mapping).
+            more_results.append(f"Unable to find one of these asset types: {new_values}.\n ABORTING!!!\n<hr>")
+            return None, None, None, more_results, True
+        validated_asset_types = [lookups.asset_types[asset_type] for asset_type in new_values]
+        if mode == 'update':
+            pending.set_m2m(destination_asset, 'asset_types', validated_asset_types)
+
+    source_field_name = 'tags'
+    if source_field_name in row:
+        new_values = eliminate_empty_strings(row[source_field_name].split('|'))
+        list_of_old_values = list_of(destination_asset.tags) if not created_new_asset else []
+        if set(new_values) != set(list_of_old_values):
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {pipe_delimit(list_of_old_values)} to {pipe_delimit(new_values)}.")
+            if mode == 'update':
+                if new_values == []:
+                    pending.set_m2m(destination_asset, 'tags', [])
+                else:
+                    validated_values = [Tag.objects.get_or_create(name=value)[0] for value in new_values]
+                    pending.set_m2m(destination_asset, 'tags', validated_values)
+
+    source_field_name = 'services'
+    if source_field_name in row:
+        new_values = eliminate_empty_strings(row[source_field_name].split('|'))
+        list_of_old_values = list_of(destination_asset.services) if not created_new_asset else []
+        if set(new_values) != set(list_of_old_values):
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {pipe_delimit(list_of_old_values)} to {pipe_delimit(new_values)}.")
+            if mode == 'update':
+                if new_values == []:
+                    pending.set_m2m(destination_asset, 'services', [])
+                else:
+                    validated_values = [ProvidedService.objects.get_or_create(name=value)[0] for value in new_values]
+                    pending.set_m2m(destination_asset, 'services', validated_values)
+
+    source_field_name = 'hard_to_count_population'
+    if source_field_name in row:
+        new_values = eliminate_empty_strings(row[source_field_name].split('|'))
+        list_of_old_values = list_of(destination_asset.hard_to_count_population) if not created_new_asset else []
+        if set(new_values) != set(list_of_old_values):
+            more_results.append(f"{source_field_name} {'will be ' if mode == 'validate' else ''}changed from {pipe_delimit(list_of_old_values)} to {pipe_delimit(new_values)}.")
+            if mode == 'update':
+                if new_values == []:
+                    pending.set_m2m(destination_asset, 'hard_to_count_population', [])
+                else:
+                    validated_values = [TargetPopulation.objects.get_or_create(name=value)[0] for value in new_values]
+                    pending.set_m2m(destination_asset, 'hard_to_count_population', validated_values)
+
+    # Fields that don't need to be updated: primary_key_from_rocket, synthesized_key, data_source_name, data_source_url
+    return destination_asset, location, organization, more_results, False
+
+
+def validate_rows(rows, using, lookups=None):
+    """Check that every Asset/RawAsset/Location/Organization referenced by the merge
+    instructions exists in the database. This is done for the whole file before
+    any changes are made. Returns a list of failure messages (which is empty if
+    the file passed validation)."""
+    if lookups is None:
+        lookups = UpdateLookups(rows, using)
+    more_results = []
+    for row in rows:
+        try:
+            if using == 'using-assets':
+                if 'asset_id' in row and row['asset_id'] not in ['']:
+                    more_results.append(f"id should be blank but is actually {row['asset_id']}. ASSET UPDATER FAILURE.")
+                    return more_results
+
+                # Verify that these match Assets in the database.
+                missing = lookups.missing(lookups.assets, row.get('id'))
+                if len(missing) > 0:
+                    more_results.append(f"Failed to find Asset with id == {row['id']}. ASSET UPDATER FAILURE.")
+                    return more_results
+
+                missing = lookups.missing(lookups.assets, row.get('ids_to_merge'))
+                if len(missing) > 0:
+                    more_results.append(f"Failed to find Assets with ids == {missing}. ASSET UPDATER FAILURE.")
+                    return more_results
+            else:
+                if row.get('id') in ['', None] or len(lookups.missing(lookups.raw_assets, row['id'])) > 0:
+                    more_results.append(f"Failed to find RawAsset with id == {row.get('id')}. ASSET UPDATER FAILURE.")
+                    return more_results
+
+                missing = lookups.missing(lookups.raw_assets, row.get('ids_to_merge'))
+                if len(missing) > 0:
+                    more_results.append(f"Failed to find RawAssets with ids == {missing}. ASSET UPDATER FAILURE.")
+                    return more_results
+
+                if len(lookups.missing(lookups.assets, row.get('asset_id'))) > 0:
+                    more_results.append(f"Failed to find Asset with id == {row['asset_id']}. ASSET UPDATER FAILURE.")
+                    return more_results
+
+            if row.get('location_id') != 'new' and len(lookups.missing(lookups.locations, row.get('location_id'))) > 0:
+                more_results.append(f"Failed to find Location with id == {row['location_id']}. ASSET UPDATER FAILURE.")
+                return more_results
+
+            if row.get('organization_id') != 'new' and len(lookups.missing(lookups.organizations, row.get('organization_id'))) > 0:
+                more_results.append(f"Failed to find Organization with id == {row['organization_id']}. ASSET UPDATER FAILURE.")
+                return more_results
+
+            if len(lookups.missing(lookups.locations, row.get('parent_location_id'))) > 0:
+                more_results.append(f"Failed to find Location with id == {row['parent_location_id']} (the parent_location_id). ASSET UPDATER FAILURE.")
+                return more_results
+        except ValueError:
+            more_results.append(f"Unable to parse the ids in this row: {row}. ASSET UPDATER FAILURE.")
+            return more_results
+
+    return more_results
+
+def process_rows(rows, mode, using, asset_ids_to_sync_to_carto, lookups=None):
+    """Validate or apply (depending on mode) the merge instructions in rows.
+    The ids of Assets that need to be synced to Carto are appended to
+    asset_ids_to_sync_to_carto (so that the syncing can be done once, at the
+    end of a job). Returns (more_results, error).
+
+    All of the changes are made in one transaction, so if any row fails, none
+    of the rows are applied."""
+    if lookups is None:
+        lookups = UpdateLookups(rows, using)
+    pending = PendingWrites()
+    with transaction.atomic(), bulk_history():
+        more_results, error = apply_rows(rows, mode, using, asset_ids_to_sync_to_carto, lookups, pending)
+        if error:
+            transaction.set_rollback(True)
+            del asset_ids_to_sync_to_carto[:]
+            more_results.append("No changes were made. ASSET UPDATER FAILURE.")
+        elif mode == 'update':
+            pending.flush()
+    return more_results, error
+
+def apply_rows(rows, mode, using, asset_ids_to_sync_to_carto, lookups, pending):
+    more_results = []
+    for row in rows:
+
+        created_new_asset = False
+        # Process the 'id' field
+        raw_id = row['id']
+        if using == 'using-raw-assets':
+            primary_raw_asset = lookups.raw_assets[int(raw_id)]
+        elif using == 'using-assets':
+            destination_asset = lookups.assets[int(raw_id)] # Note that here
+            # the primary asset is also the destination asset.
+
+        # Process the 'asset_id' field
+        if using == 'using-raw-assets':
+            asset_id = row['asset_id']
+            if asset_id in ['', None]:
+                created_new_asset = True
+                destination_asset = Asset()
+                more_results.append(f"A new Asset {'would' if mode == 'validate' else 'will'} be created.")
+            else:
+                destination_asset = lookups.assets[int(asset_id)]
+
+        # Process the 'ids_to_merge' field
+        ids_to_merge = row['ids_to_merge']
+        if using == 'using-raw-assets':
+            if ids_to_merge == '':
+                continue # Skip rows with no ids to merge.
+            raw_assets = [lookups.raw_assets[i] for i in ids_in(ids_to_merge)]
+            for raw_asset in raw_assets:
+                raw_asset.asset = destination_asset
+
+            if len(raw_assets) == 1:
+                if created_new_asset:
+                    summary = f"{'Validating this process: ' if mode == 'validate' else ''}Creating a new Asset, "
+                else:
+                    summary = f"{'Validating this process: ' if mode == 'validate' else ''}Editing the Asset with id = {asset_id}, previously named {destination_asset.name}, "
+                summary += f"and linking it to RawAsset with id = {raw_assets[0].id} and name = {raw_assets[0].name}."
+            else:
+                summary = f"{'Validating this process: ' if mode == 'validate' else ''}Merging RawAssets with ids = {', '.join([str(r.id) for r in raw_assets])} and names = {', '.join([r.name for r in raw_assets])} "
+                if created_new_asset:
+                    summary += f" to a new Asset with name {row.get('name', '(No name given)')}."
+                else:
+                    summary += f" to Asset with id = {asset_id}, previously named {destination_asset.name}."
+            more_results.append(summary)
+
+        elif using == 'using-assets':
+            # When merging Assets, the Asset that is not the destination
+            # asset should be delisted.
+            if mode == 'update':
+                if ids_to_merge == '':
+                    destination_asset.do_not_display = True
+                    destination_asset._change_reason = f'Asset Updater: Delisting Asset'
+                    pending.update(destination_asset)
+                    asset_ids_to_sync_to_carto.append(destination_asset.id)
+                    s = f"Delisting {destination_asset.name}."
+                    more_results.append(s)
+                    continue # Skip rows with no ids to merge.
+                asset_ids = ids_in(ids_to_merge)
+                assert destination_asset.id in asset_ids
+
+                assets_iterator = [lookups.assets[i] for i in asset_ids]
+                s = f"{'Validating this process: ' if mode == 'validate' else ''}Editing the Asset with id = {destination_asset.id}, previously named {destination_asset.name}."
+                more_results.append(s)
+                if len(assets_iterator) > 1:
+                    s = f"Delisting extra Assets (from the list {ids_to_merge}) and assigning corresponding RawAssets to the destination Asset."
+                    more_results.append(s)
+
+                for asset in assets_iterator:
+                    if destination_asset.id is not None and asset.id != destination_asset.id:
+                        asset.do_not_display = True # These Assets could be deleted (rather than delisted)
+                        # AFTER reassinging their RawAssets.
+                        asset._change_reason = f'Asset Updater: Delisting Asset'
+                        pending.update(asset)
+                        asset_ids_to_sync_to_carto.append(asset.id)
+
+                        # Iterate over raw assets of this asset and point them to destination_asset.
+                        for raw_asset in asset.rawasset_set.all():
+                            raw_asset.asset = destination_asset
+                            raw_asset._change_reason = f'Asset Updater: Linking RawAsset to different Asset because of Asset merge'
+                            pending.update(raw_asset)
+            else:
+                if '+' in ids_to_merge:
+                    s = f"Extra Assets (from the list {ids_to_merge}) would be delisted and corresponding RawAssets would be assigned to the destination Asset."
+                    more_results.append(s)
+                elif ids_to_merge == '':
+                    s = f"{destination_asset.name} would be delisted."
+                    more_results.append(s)
+
+        ### At this point the fields that differentiate Asset-based Asset updates from
+        ### RawAsset-based Asset updates have been processed.
+        ### What comes out of this stage is destination_asset and raw_assets.
+        destination_asset, location, organization, more_results, error = modify_destination_asset(mode, row, destination_asset, created_new_asset, more_results, lookups, pending)
+        if error:
+            return more_results, True
+
+        if mode == 'update':
+            more_results.append(f"Updating associated Asset, RawAsset, Location, and Organization instances. (This may leave some orphaned.)\n")
+            change_reason = f'Asset Updater: {"Creating new " if created_new_asset else "Updating "}Asset'
+
+            # New Locations and Organizations are saved right away (since they need ids
+            # before anything can be linked to them). Changes to existing instances are written in
+            # bulk by pending.flush().
+            if organization is not None:
+                organization._change_reason = change_reason
+                if organization.pk is None:
+                    organization.save()
+                else:
+                    pending.update(organization)
+            if location is not None:
+                location._change_reason = change_reason
+                if location.pk is None:
+                    location.save()
+                else:
+                    pending.update(location)
+            destination_asset.location = location
+            destination_asset.organization = organization
+            destination_asset._change_reason = change_reason
+            pending.update(destination_asset) # (A new destination Asset was already saved
+            # by modify_destination_asset, so it has an id.)
+            more_results.append(f'&nbsp;&nbsp;&nbsp;&nbsp;<a href="https://assets.wprdc.org/api/dev/assets/assets/{destination_asset.id}/" target="_blank">Updated Asset</a>\n')
+            if location is not None:
+                more_results.append(f'&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;<a href="https://assets.wprdc.org/api/dev/assets/locations/{location.id}/" target="_blank">Linked Location</a>\n<hr>')
+
+            if using == 'using-raw-assets':
+                for raw_asset in raw_assets:
+                    raw_asset.asset = destination_asset # (Again, now that a new destination Asset has an id.)
+                    raw_asset._change_reason = f'Asset Updater: Linking to {"new " if created_new_asset else ""}Asset'
+                    pending.update(raw_asset)
+            asset_ids_to_sync_to_carto.append(destination_asset.id)
+        else:
+            more_results.append(f"\n<hr>")
+
+    return more_results, False
+
+UPDATE_JOB_CHUNK_SIZE = 500
+
+def chunks(xs, n):
+    for i in range(0, len(xs), n):
+        yield xs[i:i + n]
+
+def run_update_job(job):
+    """Run an AssetUpdateJob (in a Huey worker), reporting progress as it goes.
+
+    The whole file is validated before anything is changed: first the ids, and
+    then (for updates) every chunk is run through process_rows in validate mode,
+    which catches the rows that modify_destination_asset would abort on. Then the
+    rows are processed in chunks of UPDATE_JOB_CHUNK_SIZE, each in a savepoint
+    of one transaction around the whole job, so a job is applied all-or-nothing:
+    if any chunk fails (or the worker crashes), none of the file is applied and
+    nothing is synced to Carto. Since the job's own row can't be updated visibly
+    from inside that transaction, the processed_rows count goes through the cache
+    (see AssetUpdateJob.record_progress) and the chunks' messages are saved once
+    the transaction is over."""
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    report = [] # The messages from the chunks (saved after the transaction).
+    try:
+        with job.file.open('rb') as f:
+            rows = list(csv.DictReader(f.read().decode('utf-8').splitlines()))
+        job.total_rows = len(rows)
+        job.save(update_fields=['total_rows'])
+
+        failures = validate_rows(rows, job.using)
+        if len(failures) > 0:
+            job.add_messages(failures)
+            job.finish('failed')
+            return
+
+        if job.mode == 'update':
+            for chunk in chunks(rows, UPDATE_JOB_CHUNK_SIZE):
+                results, error = process_rows(chunk, 'validate', job.using, [])
+                if error:
+                    job.add_messages(results)
+                    job.finish('failed')
+                    return
+
+        error = False
+        asset_ids_to_sync_to_carto = []
+        with transaction.atomic():
+            for chunk in chunks(rows, UPDATE_JOB_CHUNK_SIZE):
+                # The lookups are redone for each chunk (rather than reusing the ones from
+                # validation) so that each chunk sees the changes made by the ones before it.
+                results, error = process_rows(chunk, job.mode, job.using, asset_ids_to_sync_to_carto)
+                report += results
+                job.processed_rows += len(chunk)
+                job.record_progress(job.processed_rows)
+                if error:
+                    transaction.set_rollback(True) # (Undo the chunks before this one too.)
+                    asset_ids_to_sync_to_carto = []
+                    break
+    except Exception as e:
+        job.add_messages(report + [f"{type(e).__name__}: {e}. No changes were made. ASSET UPDATER FAILURE."])
+        job.finish('failed')
+        raise
+
+    job.add_messages(report)
+    if job.mode == 'update' and len(asset_ids_to_sync_to_carto) > 0:
+        sync_assets_to_carto_eventually(asset_ids_to_sync_to_carto)
+    job.add_messages([f"\nasset_ids_to_sync_to_carto = {asset_ids_to_sync_to_carto}"])
+    job.finish('failed' if error else 'finished')
@@ -2,7 +2,8 @@ from django.urls import re_path
 
 from rest_framework import routers
 
-from assets.views import AssetViewSet, AssetTypeViewSet, CategoryViewSet, LocationViewSet
+from assets.views import AssetViewSet, AssetTypeViewSet, CategoryViewSet, LocationViewSet, AssetIndexViewSet, \
+    GeographySummaryViewSet, AutocompleteViewSet, ChangeFeedViewSet
 
 # register DRF Views and ViewSets
 router = routers.DefaultRouter()
@@ -10,6 +11,10 @@ router.register(r'assets', AssetViewSet)
 router.register(r'asset-types', AssetTypeViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'locations', LocationViewSet)
+router.register(r'map-points', AssetIndexViewSet)
+router.register(r'geography-summaries', GeographySummaryViewSet, basename='geography-summary')
+router.register(r'autocomplete', AutocompleteViewSet, basename='autocomplete')
+router.register(r'changes', ChangeFeedViewSet, basename='change')
 
 urlpatterns = [ ]
 
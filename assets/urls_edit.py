@@ -1,6 +1,6 @@
 from django.urls import path, re_path
 
-from assets.views import upload_file, request_asset_dump
+from assets.views import upload_file, update_job_status, request_asset_dump
 
 urlpatterns = []
 
@@ -8,6 +8,7 @@ urlpatterns = []
 #    https://assets.wprdc.org/edit/update-assets/
 # and that handle bulk database edits.
 urlpatterns = [
+    path('update-assets/jobs/<int:job_id>/', update_job_status, name='update-job-status'),
     path('update-assets/<using>/', upload_file, name='update-assets'),
     re_path(r'^dump_assets/', request_asset_dump, name='request_asset_dump'),
 ]
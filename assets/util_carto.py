@@ -35,17 +35,17 @@ def extract_values_from_model(asset, fields):
 
     for field in fields:
         if field == 'asset_type':
-            value = asset.asset_types.all()[0].name # Here, we are explicitly ignoring
+            value = asset.primary_asset_type.name # Here, we are explicitly ignoring
             # asset types beyond the first (because the new policy is one
             # asset type per Asset), though this could be rectified by
             # returning a list of values strings and modifying the code on the
             # other end.
         elif field == 'asset_type_title':
-            value = asset.asset_types.all()[0].title
+            value = asset.primary_asset_type.title
         elif field == 'category':
-            value = asset.asset_types.all()[0].category.name
+            value = asset.primary_category.name
         elif field == 'category_title':
-            value = asset.asset_types.all()[0].category.title
+            value = asset.primary_category.title
         elif field in ['latitude', 'longitude']:
             value = getattr(getattr(asset, 'location', None), field, None)
         elif field == 'location_id':
@@ -183,8 +183,8 @@ def sync_asset_to_carto(a, existing_ids, pushed, insert_list, records_per_reques
         return pushed, insert_list
 
     # Compute and apply geocoordinate offsets to distinguish overlapping assets
-    overlapping_assets = a.location.asset_set.all()
-    asset_types_and_names = [{'name': a.name, 'type': a.asset_types.all()[0].name, 'asset_id': a.id} for a in overlapping_assets]
+    overlapping_assets = a.location.asset_set.select_related('primary_asset_type')
+    asset_types_and_names = [{'name': a.name, 'type': a.primary_asset_type.name, 'asset_id': a.id} for a in overlapping_assets]
         # This assumes that there is only one asset type per asset, which is not enforced by the model,
         # but which we have decided should be the case generally becausing mixing asset types may make
         # things like operating hours poorly defined.
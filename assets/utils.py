@@ -1,89 +1,59 @@
-import requests, math, time
-
-from asset_hound.settings import GEOCODER_API_KEY
-
-def distance_on_unit_sphere(lat1, long1, lat2, long2):
-    # Convert latitude and longitude to
-    # spherical coordinates in radians.
-    degrees_to_radians = math.pi/180.0
-
-    # phi = 90 - latitude
-    phi1 = (90.0 - lat1)*degrees_to_radians
-    phi2 = (90.0 - lat2)*degrees_to_radians
-
-    # theta = longitude
-    theta1 = long1*degrees_to_radians
-    theta2 = long2*degrees_to_radians
-
-    # Compute spherical distance from spherical coordinates.
-
-    # For two locations in spherical coordinates
-    # (1, theta, phi) and (1, theta', phi')
-    # cosine( arc length ) =
-    # sin phi sin phi' cos(theta-theta') + cos phi cos phi'
-    # distance = rho * arc length
-
-    cos = (math.sin(phi1)*math.sin(phi2)*math.cos(theta1 - theta2) +
-    math.cos(phi1)*math.cos(phi2))
-
-    try:
-        arc = math.acos( cos )
-    except ValueError:
-        if 1.0 < cos < 1.01:
-            cos = 1
-        try:
-            arc = math.acos( cos )
-        except ValueError:
-            ic(cos)
-            raise
-    # Remember to multiply arc by the radius of the earth
-    # in your favorite set of units to get length.
-    return arc
+import re
 
 def distance(lat1, long1, lat2, long2):
+    """Return the great-circle distance (in feet) between two points. (For arrays of
+    points, use assets.spatial.haversine_distances directly.)"""
     if lat1 in ['', None] or long1 in ['', None] or lat2 in ['', None] or long2 in ['', None]:
         return None # Don't try to calculate distances of invalid coordinates.
-    arc = distance_on_unit_sphere(lat1, long1, lat2, long2)
-    R = 20.902*1000*1000 # in feet
-    # Remember to multiply arc by the radius of the earth
-    # in your favorite set of units to get length.
-    return R*arc
-
-def geocode_address_with_geomancer(address):
-    url = "https://tools.wprdc.org/geo/geocode?addr={}".format(address)
-    r = requests.get(url)
-    result = r.json()
-    time.sleep(0.1)
-    if result['data']['status'] == "OK":
-        longitude, latitude = result['data']['geom']['coordinates']
-        return longitude, latitude
-    print("Unable to geocode {}, failing with status code {}.".format(address, result['data']['status']))
-    return None, None
-
-def geocode_address(address):
-    """ Takes a string address and attempts to geocode it using a remote geocoder
-
-    Returns ({float}, {float}) (lat,lng) tuple
+    from assets.spatial import haversine_distances # (Imported here so that NumPy is only
+    # loaded when distances are actually calculated.)
+    return float(haversine_distances(float(lat1), float(long1), float(lat2), float(long2)))
+
+ABBREVIATIONS = {
+    'street': 'st',
+    'avenue': 'ave',
+    'road': 'rd',
+    'drive': 'dr',
+    'boulevard': 'blvd',
+    'lane': 'ln',
+    'place': 'pl',
+    'court': 'ct',
+    'highway': 'hwy',
+    'suite': 'ste',
+    'north': 'n',
+    'south': 's',
+    'east': 'e',
+    'west': 'w',
+    'pennsylvania': 'pa',
+}
+
+def normalize_address(address):
+    """Reduce an address to a canonical form, so that trivially different
+    spellings ("123 Main Street, Pittsburgh, PA" vs. "123 MAIN ST  PITTSBURGH PA")
+    are treated as the same address by the geocode cache and the local geocoder."""
+    address = re.sub(r'[^\w#\s-]', ' ', (address or '').lower())
+    words = [ABBREVIATIONS.get(word, word) for word in address.split()]
+    return ' '.join(words)[:500] # (The length of GeocodeCacheEntry.normalized_address)
+
+def form_full_address_from_location(location):
+    if location.city not in ['', None]:
+        city = location.city
+    else:
+        city = location.municipality
+
+    if location.state not in ['', None]:
+        state = location.state
+    else:
+        state = 'PA'
+
+    return "{}, {}, {} {}".format(location.street_address, city, state, location.zip_code)
+
+def geocode_address(address, use_cache=True, use_local=True):
+    """ Takes a string address and attempts to geocode it, reusing the result from
+    the geocode cache if the (normalized) address has been geocoded before.
+
+    Returns ({float}, {float}, properties) (lat, lng, properties) tuple
     """
-    url = 'https://api.geocod.io/v1.4/geocode'
-    try:
-        r = requests.get(url, params={'q': address, 'api_key': GEOCODER_API_KEY})
-        response_data = r.json()
-        if 'error' in response_data:
-            print(f"Geocodio response: {response_data['error']}")
-            longitude, latitude = geocode_address_with_geomancer(address)
-            if longitude is not None:
-                return latitude, longitude, "Geocoded with Geomancer"
-            return None, None, None
-        lat = response_data['results'][0]['location']['lat']
-        lng = response_data['results'][0]['location']['lng']
-        first_result = response_data['results'][0]
-        wanted_keys = ['accuracy', 'accuracy_type', 'address_components']
-        properties = dict((k, first_result[k]) for k in wanted_keys if k in first_result)
-        properties['geocoder'] = 'Geocodio'
-        return lat, lng, properties
-    except Exception as e:
-        # todo: handle different exceptions differently
-        print(e)
-        return None, None, None
-
+    from assets.geocoding import geocode_address_with_cache # This is imported here
+    # because assets.geocoding imports assets.models, which imports this module.
+    return geocode_address_with_cache(address, use_cache=use_cache, use_local=use_local)
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    """Catches the migrations up with the Resource scheduling fields (the publish
+    dates were renamed and the event times were added without migrations)."""
+
+    dependencies = [
+        ('community_resources', '0009_resource_email'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='resource',
+            old_name='start_date',
+            new_name='start_publish_date',
+        ),
+        migrations.RenameField(
+            model_name='resource',
+            old_name='stop_date',
+            new_name='stop_publish_date',
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='start_publish_date',
+            field=models.DateField(default=django.utils.timezone.now, help_text='After this date, the resource will show up on the site (default is today)', verbose_name='Start displaying on'),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='stop_publish_date',
+            field=models.DateField(blank=True, help_text='After this date, the resource will stop showing up on the site (leave blank to keep up indefinitely)', null=True, verbose_name='Stop displaying after'),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='all_day',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='start_time',
+            field=models.TimeField(blank=True, help_text='If you selected "all day,"  you can leave this blank.', null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='end_time',
+            field=models.TimeField(blank=True, help_text='If you selected "all day,"  you can leave this blank.', null=True),
+        ),
+    ]
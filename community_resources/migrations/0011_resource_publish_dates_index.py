@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community_resources', '0010_resource_schedule_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['published', 'start_publish_date', 'stop_publish_date'], name='resource_publish_dates'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community_resources', '0011_resource_publish_dates_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceOccurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='community_resources.Resource')),
+            ],
+            options={
+                'ordering': ('start',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resourceoccurrence',
+            index=models.Index(fields=['start', 'end'], name='resource_occurrence_range'),
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.db.models.functions import Now, TruncDate
 from django.utils import timezone
 
 from ckeditor.fields import RichTextField
@@ -46,6 +50,40 @@ class Population(models.Model, WithNameSlug):
         return self.name
 
 
+class ResourceQuerySet(models.QuerySet):
+    def with_flags(self, on_date=None):
+        """Annotate each Resource with is_virtual_only (it has no Assets or other
+        Locations) and is_publishable (it's published and on_date, by default today,
+        is within its publishing dates), so that the virtual_only and publishable
+        properties don't need extra queries."""
+        on_date = on_date or TruncDate(Now())
+        return self.annotate(
+            has_assets=Exists(Resource.assets.through.objects.filter(resource_id=OuterRef('pk'))),
+            has_other_locations=Exists(Resource.other_locations.through.objects.filter(resource_id=OuterRef('pk'))),
+        ).annotate(
+            is_virtual_only=Case(When(has_assets=False, has_other_locations=False, then=Value(True)),
+                                 default=Value(False), output_field=models.BooleanField()),
+            is_publishable=Case(When(Q(published=True) & self.active_on_filter(on_date), then=Value(True)),
+                                default=Value(False), output_field=models.BooleanField()),
+        )
+
+    @staticmethod
+    def active_on_filter(on_date):
+        return Q(start_publish_date__lte=on_date) & (Q(stop_publish_date__isnull=True) | Q(stop_publish_date__gte=on_date))
+
+    def active_on(self, on_date=None):
+        """Resources whose publishing dates include on_date (by default, today)."""
+        return self.filter(self.active_on_filter(on_date or TruncDate(Now())))
+
+    def publishable(self, on_date=None):
+        return self.filter(published=True).active_on(on_date)
+
+    def occurring_between(self, start, end):
+        """Resources with an occurrence (see ResourceOccurrence) that overlaps the
+        period from start to end."""
+        return self.filter(Exists(ResourceOccurrence.objects.filter(resource_id=OuterRef('pk'), start__lt=end, end__gt=start)))
+
+
 class Resource(models.Model, WithNameSlug):
     """ Individual services rendered, supplies distributed or other resources """
     name = models.CharField(max_length=500)
@@ -63,7 +101,6 @@ class Resource(models.Model, WithNameSlug):
     # Locations
     assets = models.ManyToManyField("assets.Asset", related_name='resources', blank=True)
     other_locations = models.ManyToManyField("assets.Location", related_name='resources', blank=True)
-    virtual_only = models.BooleanField()
 
     # Timing
     recurrence = RecurrenceField(null=True, blank=True)
@@ -98,25 +135,92 @@ class Resource(models.Model, WithNameSlug):
         blank=True
     )
 
+    objects = ResourceQuerySet.as_manager()
+
     @property
     def virtual_only(self):
-        return not len(self.assets.all()) and not len(self.other_locations.all())
+        # Resources from Resource.objects.with_flags() already know.
+        if hasattr(self, 'is_virtual_only'):
+            return self.is_virtual_only
+        return not self.assets.exists() and not self.other_locations.exists()
 
     @property
     def publishable(self):
-        return self.published and (self.start_date <= timezone.now() < self.stop_date)
+        if hasattr(self, 'is_publishable'):
+            return self.is_publishable
+        today = timezone.localdate()
+        return self.published and self.start_publish_date <= today \
+            and (self.stop_publish_date is None or today <= self.stop_publish_date)
 
     @property
     def locations(self):
+        # When a batch of Resources is being serialized, attach_resource_locations()
+        # fills this in for all of them at once.
+        if hasattr(self, '_locations'):
+            return self._locations
         return Location.objects.filter(asset__in=self.assets.all()) | self.other_locations.all()
 
+    search_vector = SearchVectorField(null=True, editable=False) # Maintained by assets/search.py
+
     class Meta:
         ordering = ('priority',)
+        indexes = [models.Index(fields=['published', 'start_publish_date', 'stop_publish_date'],
+                                name='resource_publish_dates'),
+                   GinIndex(fields=['search_vector'], name='resource_search_vector')]
 
     def __str__(self):
         return self.name
 
 
+class ResourceOccurrence(models.Model):
+    """One occurrence of a recurring Resource, expanded from its recurrence for a
+    rolling horizon by community_resources/occurrences.py."""
+    resource = models.ForeignKey('Resource', related_name='occurrences', on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        ordering = ('start',)
+        indexes = [models.Index(fields=['start', 'end'], name='resource_occurrence_range')]
+
+    def __str__(self):
+        return f'{self.resource_id} {self.start}'
+
+
+def attach_resource_locations(resources):
+    """Look up the Locations of all the given Resources (those of their Assets plus
+    their other_locations) with one UNION query, along with their parent Locations,
+    and cache them on the Resources (for Resource.locations)."""
+    resources = [resource for resource in resources if not hasattr(resource, '_locations')]
+    if not resources:
+        return
+    resource_ids = [resource.id for resource in resources]
+    via_assets = Location.objects.annotate(resource_id=models.F('asset__resources')) \
+        .filter(resource_id__in=resource_ids)
+    via_other_locations = Location.objects.annotate(resource_id=models.F('resources')) \
+        .filter(resource_id__in=resource_ids)
+    locations_by_resource = {resource_id: {} for resource_id in resource_ids}
+    for location in via_assets.union(via_other_locations, all=True):
+        locations_by_resource[location.resource_id].setdefault(location.id, location)
+    attach_parent_locations([location for locations in locations_by_resource.values() for location in locations.values()])
+    for resource in resources:
+        locations = locations_by_resource[resource.id]
+        resource._locations = [locations[location_id] for location_id in sorted(locations)]
+
+
+def attach_parent_locations(locations):
+    """Fill in parent_location (recursively) for the given Locations with one query
+    per level of nesting, instead of one query per Location."""
+    parents = {}
+    while locations:
+        missing = {location.parent_location_id for location in locations} - set(parents) - {None}
+        parents.update(Location.objects.in_bulk(missing))
+        for location in locations:
+            if location.parent_location_id is not None:
+                location.parent_location = parents[location.parent_location_id]
+        locations = [parents[location_id] for location_id in missing]
+
+
 class CategorySection(models.Model, WithNameSlug):
     """  Stores rich content displayed in category sections of community pages. """
     community = models.ForeignKey('Community', related_name='category_sections', on_delete=models.CASCADE)
@@ -146,12 +250,15 @@ class Community(models.Model, WithNameSlug):
 
     resources = models.ManyToManyField('Resource', related_name='communities')
 
+    search_vector = SearchVectorField(null=True, editable=False) # Maintained by assets/search.py
+
     @property
     def resource_categories(self):
         return ResourceCategory.objects.all()
 
     class Meta:
         verbose_name_plural = 'Communities'
+        indexes = [GinIndex(fields=['search_vector'], name='community_search_vector')]
 
     def __str__(self):
         return f'{self.name}'
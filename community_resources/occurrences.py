@@ -0,0 +1,66 @@
+"""Resource recurrences (RRULEs from django-recurrence) are expanded into the
+ResourceOccurrence table for a rolling horizon, so that calendar questions like
+"what's available this week?" are answered with an indexed range scan instead of
+expanding every Resource's recurrence on every request.
+
+Occurrences are regenerated for a Resource when it's saved (see
+community_resources/signals.py) and for all Resources every night, which also
+rolls the horizon forward."""
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.db import transaction
+from django.utils import timezone
+
+from community_resources.models import Resource, ResourceOccurrence
+
+HORIZON_DAYS = 120 # How far ahead occurrences are generated
+LOCAL_TIMEZONE = pytz.timezone('America/New_York') # Resource start and end times are local times.
+
+
+def localize(dt):
+    return LOCAL_TIMEZONE.localize(dt)
+
+
+def expand_occurrences(resource, first_day, last_day):
+    """Yield (start, end) pairs for each day from first_day through last_day on
+    which the Resource recurs. All-day Resources (and Resources without a start
+    time) take up the whole day."""
+    if not resource.recurrence:
+        return
+    window_start = datetime.combine(first_day, time.min)
+    window_end = datetime.combine(last_day, time.max)
+    days = resource.recurrence.between(window_start, window_end, inc=True,
+                                       dtstart=resource.recurrence.dtstart or window_start)
+    for day in sorted({occurrence.date() for occurrence in days}):
+        if resource.all_day or resource.start_time is None:
+            yield localize(datetime.combine(day, time.min)), localize(datetime.combine(day + timedelta(days=1), time.min))
+            continue
+        start = datetime.combine(day, resource.start_time)
+        if resource.end_time is None:
+            end = start
+        elif resource.end_time < resource.start_time: # (It runs past midnight.)
+            end = datetime.combine(day + timedelta(days=1), resource.end_time)
+        else:
+            end = datetime.combine(day, resource.end_time)
+        yield localize(start), localize(end)
+
+
+def regenerate_occurrences(resource_ids=None, horizon_days=HORIZON_DAYS):
+    """Replace the ResourceOccurrences of the given Resources (or of all Resources)
+    with those from today through the horizon."""
+    first_day = timezone.now().astimezone(LOCAL_TIMEZONE).date()
+    last_day = first_day + timedelta(days=horizon_days)
+    resources = Resource.objects.only('id', 'recurrence', 'all_day', 'start_time', 'end_time')
+    if resource_ids is not None:
+        resources = resources.filter(pk__in=resource_ids)
+    occurrences = [ResourceOccurrence(resource_id=resource.id, start=start, end=end)
+                   for resource in resources
+                   for start, end in expand_occurrences(resource, first_day, last_day)]
+    with transaction.atomic():
+        stale = ResourceOccurrence.objects.all()
+        if resource_ids is not None:
+            stale = stale.filter(resource_id__in=resource_ids)
+        stale.delete()
+        ResourceOccurrence.objects.bulk_create(occurrences, batch_size=1000)
+    return len(occurrences)
@@ -0,0 +1,58 @@
+"""Community page payloads (the serialized CommunitySerializer output) are rendered
+ahead of time into the cache by community_resources/tasks.py whenever a Community,
+its resources, or its category sections change, so that community pages are served
+straight from the cache and reflect admin edits within seconds."""
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from community_resources.models import Community, Resource, ResourceCategory, CategorySection
+from community_resources.serializers import CommunitySerializer
+from geo.models import Neighborhood
+
+# Everything ResourceSerializer needs except locations (see attach_resource_locations).
+RESOURCE_QUERYSET = Resource.objects.with_flags().prefetch_related('categories', 'populations_served')
+
+COMMUNITY_QUERYSET = Community.objects.prefetch_related(
+    Prefetch('neighborhoods', queryset=Neighborhood.objects.only('name')),
+    Prefetch('category_sections', queryset=CategorySection.objects.select_related('category')),
+    Prefetch('resources', queryset=RESOURCE_QUERYSET),
+)
+
+
+def payload_key(community_id):
+    return f'community-payload:{community_id}'
+
+
+class PublicUrls(object):
+    """Stands in for the request when payloads are rendered outside of one, so that
+    file URLs (like ResourceCategory images) still come out absolute."""
+    def build_absolute_uri(self, location):
+        return urljoin(settings.PUBLIC_BASE_URL, location)
+
+
+def render_community_payloads(community_ids=None):
+    """Serialize the given Communities (or all of them) and store the results in the
+    cache. Payloads don't expire; they're replaced when something changes."""
+    communities = COMMUNITY_QUERYSET.all()
+    if community_ids is not None:
+        communities = communities.filter(pk__in=community_ids)
+    communities = list(communities)
+    context = {'request': PublicUrls(), 'resource_categories': list(ResourceCategory.objects.all())}
+    payloads = {community.id: data for community, data in
+                zip(communities, CommunitySerializer(communities, many=True, context=context).data)}
+    cache.set_many({payload_key(community_id): data for community_id, data in payloads.items()}, timeout=None)
+    if community_ids is not None: # (Forget the payloads of deleted Communities.)
+        cache.delete_many([payload_key(community_id) for community_id in set(community_ids) - set(payloads)])
+    return payloads
+
+
+def get_community_payload(community_id):
+    """Return the payload for a Community, rendering it now if it isn't cached
+    (or None if there's no such Community)."""
+    payload = cache.get(payload_key(community_id))
+    if payload is None:
+        payload = render_community_payloads([community_id]).get(community_id, None)
+    return payload
@@ -0,0 +1,21 @@
+"""Search documents for community_resources models (see assets/search.py)."""
+from assets.search import register_search_document, weighted, names_sql
+from community_resources.models import Community, Resource
+
+
+def without_html(text_sql):
+    # Descriptions and page content are rich text.
+    return f"regexp_replace({text_sql}, '<[^>]*>', ' ', 'g')"
+
+
+register_search_document(Community, ' || '.join([
+    weighted('t.name', 'A'),
+    weighted(without_html('t.top_section_content'), 'C'),
+]))
+
+register_search_document(Resource, ' || '.join([
+    weighted('t.name', 'A'),
+    weighted(names_sql(Resource._meta.get_field('categories'), 't.id'), 'B'),
+    weighted(names_sql(Resource._meta.get_field('populations_served'), 't.id'), 'B'),
+    weighted(without_html('t.description'), 'C'),
+]))
@@ -1,7 +1,9 @@
+from django.db import models
 from rest_framework import serializers
 
 from assets.serializers import AssetSerializer, LocationSerializer
-from community_resources.models import Resource, ResourceCategory, Population, Community, CategorySection
+from community_resources.models import Resource, ResourceCategory, Population, Community, CategorySection, \
+    attach_resource_locations
 from geo.serializers import GeographySerializer
 from geo.models import Neighborhood
 
@@ -26,10 +28,23 @@ class PopulationSerializer(serializers.ModelSerializer):
         fields = ['name', 'slug', 'description']
 
 
+def as_list(data):
+    return list(data.all() if isinstance(data, models.Manager) else data)
+
+
+class ResourceListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        resources = as_list(data)
+        attach_resource_locations(resources)
+        return super().to_representation(resources)
+
+
 class ResourceSerializer(serializers.ModelSerializer):
     categories = ResourceCategorySerializer(many=True)
     populations_served = PopulationSerializer(many=True)
     locations = LocationSerializer(many=True)
+    virtual_only = serializers.BooleanField(read_only=True)
+    publishable = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Resource
@@ -43,12 +58,15 @@ class ResourceSerializer(serializers.ModelSerializer):
             'categories',
             'populations_served',
             'locations',
+            'virtual_only',
             'recurrence',
             'all_day',
             'start_time',
             'end_time',
             'priority',
+            'publishable',
         ]
+        list_serializer_class = ResourceListSerializer
 
 
 class NeighborhoodSerializer(serializers.ModelSerializer):
@@ -57,14 +75,30 @@ class NeighborhoodSerializer(serializers.ModelSerializer):
         fields = ['name', ]
 
 
+class CommunityListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        communities = as_list(data)
+        # Resolve the locations of every community's resources at once.
+        attach_resource_locations([resource for community in communities for resource in community.resources.all()])
+        return super().to_representation(communities)
+
+
 class CommunitySerializer(serializers.ModelSerializer):
     # neighborhoods = GeographySerializer(many=True)
     neighborhoods = NeighborhoodSerializer(many=True)
 
     resources = ResourceSerializer(many=True)
-    resource_categories = ResourceCategorySerializer(many=True)
+    resource_categories = serializers.SerializerMethodField()
     category_sections = CategorySectionSerializer(many=True)
 
+    def get_resource_categories(self, community):
+        # The view puts the (shared) list of categories in the context so that it isn't
+        # queried again for every community.
+        categories = self.context.get('resource_categories', None)
+        if categories is None:
+            categories = community.resource_categories
+        return ResourceCategorySerializer(categories, many=True, context=self.context).data
+
     class Meta:
         model = Community
         fields = [
@@ -77,3 +111,4 @@ class CommunitySerializer(serializers.ModelSerializer):
             'category_sections',
             'resources',
         ]
+        list_serializer_class = CommunityListSerializer
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from assets.tasks import schedule_search_vector_update
+from community_resources.models import Community, Resource, ResourceCategory, Population, CategorySection
+from community_resources.tasks import schedule_community_payload_render, regenerate_occurrences_eventually
+import community_resources.search # This registers the search documents.
+
+
+def rerender_on_commit(community_ids):
+    community_ids = list(community_ids)
+    transaction.on_commit(lambda: schedule_community_payload_render(community_ids))
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def rerender_community(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rerender_on_commit([instance.id])
+
+
+@receiver(post_save, sender=CategorySection)
+@receiver(post_delete, sender=CategorySection)
+def rerender_community_of_section(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rerender_on_commit([instance.community_id])
+
+
+@receiver(post_save, sender=Resource)
+@receiver(pre_delete, sender=Resource) # (After the delete, the Resource's communities are gone.)
+def rerender_communities_of_resource(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rerender_on_commit(instance.communities.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Resource)
+def regenerate_occurrences_of_resource(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Re-expand the Resource's recurrence in case it (or its times) changed."""
+    if raw or (update_fields is not None and not {'recurrence', 'all_day', 'start_time', 'end_time'} & set(update_fields)):
+        return
+    resource_id = instance.id
+    transaction.on_commit(lambda: regenerate_occurrences_eventually([resource_id]))
+
+
+@receiver(post_save, sender=ResourceCategory)
+@receiver(post_delete, sender=ResourceCategory)
+@receiver(post_save, sender=Population)
+@receiver(post_delete, sender=Population)
+def rerender_all_communities(sender, raw=False, **kwargs):
+    """Every community page lists all the resource categories (and the populations
+    are shared by many resources), so re-render them all."""
+    if raw:
+        return
+    rerender_on_commit(Community.objects.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Community.resources.through)
+@receiver(m2m_changed, sender=Community.neighborhoods.through)
+@receiver(m2m_changed, sender=Resource.categories.through)
+@receiver(m2m_changed, sender=Resource.populations_served.through)
+@receiver(m2m_changed, sender=Resource.assets.through)
+@receiver(m2m_changed, sender=Resource.other_locations.through)
+def rerender_after_links_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Links can be changed from either side, so work out which communities were
+    affected from whichever of instance and pk_set are Communities or Resources."""
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+    community_ids = set()
+    if isinstance(instance, Community):
+        community_ids.add(instance.id)
+    elif isinstance(instance, Resource):
+        community_ids.update(instance.communities.values_list('id', flat=True))
+    elif pk_set is None: # (Something else's links were cleared, so we don't know which.)
+        community_ids.update(Community.objects.values_list('id', flat=True))
+    if pk_set is not None:
+        if model is Community:
+            community_ids.update(pk_set)
+        elif model is Resource:
+            community_ids.update(Community.objects.filter(resources__in=pk_set).values_list('id', flat=True))
+    rerender_on_commit(community_ids)
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_save, sender=Resource)
+def update_search_vector_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_search_vector_update(sender, [instance.id])
+
+
+@receiver(m2m_changed, sender=Resource.categories.through)
+@receiver(m2m_changed, sender=Resource.populations_served.through)
+def update_search_vectors_after_links_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Category and population names are part of Resources' search documents."""
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if not reverse:
+        schedule_search_vector_update(Resource, [instance.id])
+    elif pk_set is not None:
+        schedule_search_vector_update(Resource, pk_set)
@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from huey import crontab
+from huey.contrib.djhuey import periodic_task, task
+
+from community_resources.occurrences import regenerate_occurrences
+from community_resources.payloads import render_community_payloads
+
+PAYLOAD_RENDER_DELAY = 5 # seconds to wait (collecting more changes) before re-rendering a community
+
+def pending_key(community_id):
+    return f'community-payload-render-pending:{community_id}'
+
+@task()
+def render_community_payloads_eventually(community_ids):
+    cache.delete_many([pending_key(community_id) for community_id in community_ids])
+    render_community_payloads(community_ids)
+
+def schedule_community_payload_render(community_ids):
+    """Re-render the payloads of the given Communities shortly, skipping those that
+    already have a render pending (so that saving a Resource with all its inlines
+    doesn't re-render its communities once per inline)."""
+    community_ids = [community_id for community_id in set(community_ids)
+                     if cache.add(pending_key(community_id), True, timeout=PAYLOAD_RENDER_DELAY * 10)]
+    if community_ids:
+        render_community_payloads_eventually.schedule(args=(community_ids,), delay=PAYLOAD_RENDER_DELAY)
+
+@periodic_task(crontab(hour='5', minute='30'))
+def render_community_payloads_nightly():
+    # This catches changes that don't send signals (like queryset updates) and changes
+    # to Assets and Locations used by resources.
+    render_community_payloads()
+
+@task()
+def regenerate_occurrences_eventually(resource_ids):
+    regenerate_occurrences(resource_ids)
+
+@periodic_task(crontab(hour='3', minute='30'))
+def regenerate_occurrences_nightly():
+    # This also moves the rolling horizon forward a day.
+    regenerate_occurrences()
@@ -1,3 +1,175 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recurrence import DAILY, MO, WEEKLY, Recurrence, Rule
+
+from assets.models import Asset, Location
+from community_resources.models import Community, CategorySection, Population, Resource, ResourceCategory
+from community_resources.occurrences import HORIZON_DAYS, LOCAL_TIMEZONE, expand_occurrences, regenerate_occurrences
+from community_resources.payloads import payload_key, render_community_payloads
+from geo.models import Neighborhood
+
+
+def add_resource(i, **kwargs):
+    """Add a Resource with an Asset's Location (which has a parent Location) and
+    another Location."""
+    resource = Resource.objects.create(name=f'Resource {i}', description='Groceries', **kwargs)
+    building = Location.objects.create(street_address=f'{i} Main St', city='Pittsburgh', state='PA')
+    asset = Asset(name=f'Asset {i}', location=Location.objects.create(street_address=f'{i} Main St', unit='2',
+                                                                     parent_location=building))
+    asset.save(override_carto_sync=True)
+    resource.assets.add(asset)
+    resource.other_locations.add(Location.objects.create(street_address=f'{i} Side St'))
+    resource.categories.add(ResourceCategory.objects.get_or_create(name='Food', description='Food')[0])
+    resource.populations_served.add(Population.objects.get_or_create(name='Seniors', description='Seniors')[0])
+    return resource
+
+
+def add_community(i):
+    community = Community.objects.create(name=f'Community {i}')
+    x, y = -80 + i * 0.01, 40.4
+    community.neighborhoods.add(Neighborhood.objects.create(name=f'Hood {i}', geom=MultiPolygon(
+        Polygon(((x, y), (x, y + 0.01), (x + 0.01, y + 0.01), (x + 0.01, y), (x, y))))))
+    CategorySection.objects.create(community=community, category=ResourceCategory.objects.get_or_create(
+        name='Food', description='Food')[0], content='Where to find food')
+    community.resources.add(add_resource(2 * i), add_resource(2 * i + 1))
+    return community
+
+
+class CommunityQueryCountTestCase(TestCase):
+    def setUp(self):
+        add_community(0)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/dev/resources/community/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), Community.objects.count())
+        return len(context.captured_queries)
+
+    def test_listing_communities_costs_a_fixed_number_of_queries(self):
+        before = self.count_queries()
+        add_community(1)
+        self.assertEqual(self.count_queries(), before)
+
+    def test_resource_locations_are_included(self):
+        community = self.client.get('/api/dev/resources/community/').json()[0]
+        locations = community['resources'][0]['locations']['features']
+        self.assertEqual(len(locations), 2)
+        self.assertEqual(sorted(bool(location['properties']['parentLocation']) for location in locations), [False, True])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CommunityPayloadTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.community = add_community(0)
+
+    def get(self):
+        return self.client.get(f'/api/dev/resources/community/{self.community.id}/')
+
+    def test_payloads_are_served_from_the_cache(self):
+        self.assertEqual(self.get().json()['name'], 'Community 0') # (Rendered on the spot.)
+        self.assertIsNotNone(cache.get(payload_key(self.community.id)))
+        Community.objects.filter(pk=self.community.pk).update(name='Renamed') # (No signals are sent.)
+        self.assertEqual(self.get().json()['name'], 'Community 0')
+        render_community_payloads([self.community.id])
+        self.assertEqual(self.get().json()['name'], 'Renamed')
+
+    def test_deleted_communities_are_forgotten(self):
+        self.get()
+        community_id = self.community.id
+        self.community.delete()
+        render_community_payloads([community_id])
+        self.assertIsNone(cache.get(payload_key(community_id)))
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_changes_schedule_a_rerender(self):
+        resource = self.community.resources.first()
+        with patch('django.db.transaction.on_commit', lambda callback: callback()), \
+                patch('community_resources.signals.schedule_community_payload_render') as schedule, \
+                patch('community_resources.signals.regenerate_occurrences_eventually'), \
+                patch('community_resources.signals.schedule_search_vector_update'):
+            resource.name = 'Food Pantry'
+            resource.save()
+            resource.categories.clear()
+        self.assertEqual([sorted(call[0][0]) for call in schedule.call_args_list], [[self.community.id]] * 2)
+
+
+class ResourcePublishingTestCase(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        days = lambda n: self.today + timedelta(days=n)
+        for name, published, start, stop in [('Current', True, days(-1), None), ('Expired', True, days(-10), days(-5)),
+                                             ('Upcoming', True, days(5), None), ('Draft', False, days(-1), None)]:
+            Resource.objects.create(name=name, description=name, published=published,
+                                    start_publish_date=start, stop_publish_date=stop)
+        add_resource(0, published=True, start_publish_date=days(-1)) # (Not virtual only.)
+
+    def names(self, resources):
+        return sorted(resource.name for resource in resources)
+
+    def get_names(self, **params):
+        response = self.client.get('/api/dev/resources/resource/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(resource['name'] for resource in response.json())
+
+    def test_querysets(self):
+        self.assertEqual(self.names(Resource.objects.publishable()), ['Current', 'Resource 0'])
+        self.assertEqual(self.names(Resource.objects.active_on(self.today - timedelta(days=7))), ['Expired'])
+        self.assertEqual(self.names(Resource.objects.active_on(self.today + timedelta(days=5))),
+                         ['Current', 'Draft', 'Resource 0', 'Upcoming'])
+
+    def test_flags_match_the_properties(self):
+        for resource in Resource.objects.with_flags():
+            fresh = Resource.objects.get(pk=resource.pk)
+            self.assertEqual((resource.publishable, resource.virtual_only), (fresh.publishable, fresh.virtual_only))
+        self.assertEqual(self.names(r for r in Resource.objects.with_flags() if not r.virtual_only), ['Resource 0'])
+
+    def test_filters(self):
+        self.assertEqual(self.get_names(published='false'), ['Draft'])
+        self.assertEqual(self.get_names(published='true', active_on=str(self.today - timedelta(days=7))), ['Expired'])
+        self.assertEqual(len(self.get_names()), 5)
+
+    def test_bad_filters_are_rejected(self):
+        for params in [{'published': 'maybe'}, {'active_on': 'yesterday'}, {'active_on': '2020-02-30'}]:
+            self.assertEqual(self.client.get('/api/dev/resources/resource/', params).status_code, 400)
+
+
+class ResourceOccurrenceTestCase(TestCase):
+    def expand(self, **kwargs):
+        resource = Resource(name='Pantry', recurrence=Recurrence(rrules=[Rule(WEEKLY, byday=[MO])]), **kwargs)
+        return [(start.replace(tzinfo=None), end.replace(tzinfo=None))
+                for start, end in expand_occurrences(resource, date(2020, 6, 1), date(2020, 6, 14))]
+
+    def test_expansion(self):
+        self.assertEqual(self.expand(start_time=time(9), end_time=time(11)),
+                         [(datetime(2020, 6, 1, 9), datetime(2020, 6, 1, 11)), (datetime(2020, 6, 8, 9), datetime(2020, 6, 8, 11))])
+        self.assertEqual(self.expand(start_time=time(22), end_time=time(2))[0], (datetime(2020, 6, 1, 22), datetime(2020, 6, 2, 2)))
+        self.assertEqual(self.expand(all_day=True, start_time=time(9))[0], (datetime(2020, 6, 1), datetime(2020, 6, 2)))
+        self.assertEqual(list(expand_occurrences(Resource(name='Once'), date(2020, 6, 1), date(2020, 6, 14))), [])
+
+    def test_occurrences_are_regenerated_and_filtered_on(self):
+        daily = Resource.objects.create(name='Daily', description='Daily', start_time=time(9), end_time=time(10),
+                                        recurrence=Recurrence(rrules=[Rule(DAILY)]))
+        Resource.objects.create(name='Once', description='Once')
+        self.assertEqual(regenerate_occurrences(), HORIZON_DAYS + 1)
+        self.assertEqual(regenerate_occurrences([daily.id]), HORIZON_DAYS + 1) # (Replacing the old ones.)
+        self.assertEqual(daily.occurrences.count(), HORIZON_DAYS + 1)
+
+        tomorrow = timezone.now().astimezone(LOCAL_TIMEZONE).date() + timedelta(days=1)
+        start = LOCAL_TIMEZONE.localize(datetime.combine(tomorrow, time(9, 30)))
+        self.assertEqual(list(Resource.objects.occurring_between(start, start + timedelta(minutes=1))), [daily])
+        self.assertEqual(list(Resource.objects.occurring_between(start + timedelta(hours=1), start + timedelta(hours=2))), [])
+        response = self.client.get('/api/dev/resources/resource/', {'between': f'{tomorrow},{tomorrow}'})
+        self.assertEqual([resource['name'] for resource in response.json()], ['Daily'])
+
+    def test_bad_periods_are_rejected(self):
+        for between in ['2020-06-01', '2020-06-07,2020-06-01', '2020-06-01,someday']:
+            self.assertEqual(self.client.get('/api/dev/resources/resource/', {'between': between}).status_code, 400)
@@ -1,31 +1,99 @@
+from datetime import datetime, time, timedelta
+
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.shortcuts import render
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
-from rest_framework import viewsets, filters
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
 
-from community_resources.models import Community, Resource
+from assets.search import RankedSearchFilter
+from community_resources.models import ResourceCategory
+from community_resources.occurrences import LOCAL_TIMEZONE
+from community_resources.payloads import COMMUNITY_QUERYSET, RESOURCE_QUERYSET, get_community_payload
 from community_resources.serializers import CommunitySerializer, ResourceSerializer
 
-CACHE_TTL = 15 * 60  # 15 mins
-
 
 class CommunityViewSet(viewsets.ModelViewSet):
-    queryset = Community.objects.all()
+    queryset = COMMUNITY_QUERYSET
     pagination_class = LimitOffsetPagination
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [RankedSearchFilter]
     search_fields = ['name', ]
     serializer_class = CommunitySerializer
 
-    @method_decorator(cache_page(CACHE_TTL))
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['resource_categories'] = list(ResourceCategory.objects.all())
+        return context
+
     def retrieve(self, request, *args, **kwargs):
-        return super(CommunityViewSet, self).retrieve(request, *args, **kwargs)
+        # Community pages are rendered ahead of time (see community_resources/payloads.py).
+        try:
+            payload = get_community_payload(int(kwargs['pk']))
+        except ValueError:
+            payload = None
+        if payload is None:
+            raise Http404
+        return Response(payload)
 
 
 class ResourceViewSet(viewsets.ModelViewSet):
-    queryset = Resource.objects.all()
+    """Resources, optionally narrowed with `published=true` (or false),
+    `active_on=YYYY-MM-DD` (resources whose publishing dates include that date), and
+    `between=<start>,<end>` (resources that occur during that period, according to
+    their recurrences; the ends can be dates or datetimes, and an end date is
+    included)."""
+    queryset = RESOURCE_QUERYSET
     pagination_class = LimitOffsetPagination
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [RankedSearchFilter]
     search_fields = ['name', ]
     serializer_class = ResourceSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        published = self.request.GET.get('published', None)
+        if published is not None:
+            if published.lower() not in ('true', 'false'):
+                raise ValidationError({'published': ['Use true or false.']})
+            queryset = queryset.filter(published=(published.lower() == 'true'))
+        active_on = self.request.GET.get('active_on', None)
+        if active_on is not None:
+            try:
+                on_date = parse_date(active_on)
+            except ValueError: # (Well-formed but invalid, like 2020-02-30.)
+                on_date = None
+            if on_date is None:
+                raise ValidationError({'active_on': ['Use a date like 2020-06-01.']})
+            queryset = queryset.active_on(on_date)
+        between = self.request.GET.get('between', None)
+        if between is not None:
+            start, end = self.parse_period(between)
+            queryset = queryset.occurring_between(start, end)
+        return queryset
+
+    @staticmethod
+    def parse_period(value):
+        """Turn 'start,end' into a pair of (aware) datetimes."""
+        error = ValidationError({'between': ['Use two dates or datetimes, like 2020-06-01,2020-06-07.']})
+        parts = value.split(',')
+        if len(parts) != 2:
+            raise error
+        bounds = []
+        for i, part in enumerate(parts):
+            try:
+                moment = parse_datetime(part)
+                if moment is None and parse_date(part) is not None:
+                    # End dates are inclusive, so a date at the end means the next midnight.
+                    moment = datetime.combine(parse_date(part) + timedelta(days=i), time.min)
+            except ValueError: # (Well-formed but invalid, like 2020-02-30.)
+                moment = None
+            if moment is None:
+                raise error
+            bounds.append(moment if timezone.is_aware(moment) else LOCAL_TIMEZONE.localize(moment))
+        if bounds[0] > bounds[1]:
+            raise error
+        return bounds
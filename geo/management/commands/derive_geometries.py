@@ -0,0 +1,8 @@
+from django.core.management.base import BaseCommand
+from ...scripts import derive_geometries
+
+class Command(BaseCommand):
+    help = "Derive simplified geometries (for lower-resolution map display) from the loaded geographies"
+
+    def handle(self, *args, **options):
+        derive_geometries.run()
@@ -5,8 +5,19 @@ class Command(BaseCommand):
     help = "Load standard geographies"
 
     def add_arguments(self, parser):
-        # todo: add arguments that map to the `load_census_boundaries.run()` ones
-        pass
+        names = ', '.join(load_census_boundaries.mappings.keys())
+        parser.add_argument('--ignore', default='', help=f'Comma-separated layers to skip (from {names})')
+        parser.add_argument('--only', default='', help='Comma-separated layers to load (default: all)')
+        parser.add_argument('--keep-existing', action='store_true', help="Don't delete the existing rows before loading")
+        parser.add_argument('--step', type=int, default=1000, help='Features saved per savepoint')
+        parser.add_argument('--processes', type=int, default=1, help='Number of layers to load in parallel')
 
     def handle(self, *args, **options):
-        load_census_boundaries.run()
+        split = lambda value: [x for x in value.split(',') if x]
+        load_census_boundaries.run(
+            ignore=split(options['ignore']),
+            only=split(options['only']),
+            clear_first=not options['keep_existing'],
+            step=options['step'],
+            processes=options['processes'],
+        )
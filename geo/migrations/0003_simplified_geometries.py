@@ -0,0 +1,22 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0002_auto_20200521_1533'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geography',
+            name='geom_medium',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='geography',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+    ]
@@ -0,0 +1,17 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0003_simplified_geometries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geography',
+            name='extent',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), blank=True, null=True, size=4),
+        ),
+    ]
@@ -2,7 +2,7 @@ from enum import Enum
 
 from django.contrib.gis.db import models
 
-from .common import Geography
+from .common import Geography, resolve_hierarchies
 
 from .local import Neighborhood
 
@@ -19,3 +19,17 @@ from .census import (
     StateSenate,
 )
 
+# Geography levels by the names used in the API and elsewhere (for instance,
+# `?geography=tract:42003010300` on the assets API).
+GEOGRAPHY_LEVELS = {
+    'neighborhood': Neighborhood,
+    'tract': Tract,
+    'block_group': BlockGroup,
+    'county': County,
+    'county_subdivision': CountySubdivision,
+    'place': Place,
+    'puma': Puma,
+    'school_district': SchoolDistrict,
+    'state_house': StateHouse,
+    'state_senate': StateSenate,
+}
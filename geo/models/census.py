@@ -68,9 +68,8 @@ class Tract(CensusGeography):
     class Meta:
         verbose_name_plural = "Tracts"
 
-    @property
-    def hierarchy(self):
-        return [County.objects.get(geoid=f'{self.statefp}{self.countyfp}')]
+    def hierarchy_keys(self):
+        return [(County, f'{self.statefp}{self.countyfp}')]
 
     @property
     def census_geo(self):
@@ -95,10 +94,9 @@ class BlockGroup(CensusGeography):
     def title(self):
         return f'BlockGroup {self.name}'
 
-    @property
-    def hierarchy(self):
-        return [County.objects.get(geoid=f'{self.statefp}{self.countyfp}'),
-                Tract.objects.get(geoid=f'{self.statefp}{self.countyfp}{self.tractce}')]
+    def hierarchy_keys(self):
+        return [(County, f'{self.statefp}{self.countyfp}'),
+                (Tract, f'{self.statefp}{self.countyfp}{self.tractce}')]
 
     @property
     def census_geo(self):
@@ -127,9 +125,8 @@ class CountySubdivision(CensusGeography):
     def title(self):
         return f'{self.name}'
 
-    @property
-    def hierarchy(self):
-        return [County.objects.get(geoid=f'{self.statefp}{self.countyfp}')]
+    def hierarchy_keys(self):
+        return [(County, f'{self.statefp}{self.countyfp}')]
 
     @property
     def census_geo(self):
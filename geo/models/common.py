@@ -1,7 +1,10 @@
 from abc import abstractmethod
+from collections import defaultdict
 from typing import List
 
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.utils.functional import cached_property
 
 from geo.utils import clean_sql
 
@@ -21,6 +24,12 @@ class Geography(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     geom = models.MultiPolygonField()
+    # Simplified copies of geom for drawing maps at lower zoom levels (see
+    # geo/scripts/derive_geometries.py).
+    geom_medium = models.MultiPolygonField(null=True, blank=True)
+    geom_low = models.MultiPolygonField(null=True, blank=True)
+    # (xmin, ymin, xmax, ymax) of geom, precomputed at load time (see geo/scripts/derive_geometries.py)
+    extent = ArrayField(models.FloatField(), size=4, null=True, blank=True)
 
     @property
     def title(self):
@@ -35,13 +44,28 @@ class Geography(models.Model):
             return f'{self.geo_level_title} in {parent.title}'
         return self.geo_level_title
 
-    @property
-    def hierarchy(self):
+    def hierarchy_keys(self) -> list:
+        """ (model, primary key) pairs for the parent geographies, from the top down """
         return []
 
+    @cached_property
+    def hierarchy(self):
+        # This is memoized per instance, and `resolve_hierarchies` can fill it in
+        # for many geographies at once.
+        return [model.objects.get(pk=pk) for model, pk in self.hierarchy_keys()]
+
+    def geometry_at(self, resolution: str):
+        """ Returns the geometry for the given resolution ('low', 'medium', or 'high'),
+        falling back to more detailed geometries if the simplified ones haven't been derived yet."""
+        if resolution == 'low':
+            return self.geom_low or self.geom_medium or self.geom
+        if resolution == 'medium':
+            return self.geom_medium or self.geom
+        return self.geom
+
     @property
     def bbox(self):
-        extent = self.geom.extent  # (xmin, ymin, xmax, ymax)
+        extent = self.extent or self.geom.extent  # (xmin, ymin, xmax, ymax)
         return [list(extent[0:2]), list(extent[2:4])]
 
     @property
@@ -62,3 +86,19 @@ class Geography(models.Model):
 
     def __str__(self):
         return self.name
+
+
+def resolve_hierarchies(geographies):
+    """ Fills in the `hierarchy` of each of the geographies, using one query per
+        parent model (instead of one or two queries per geography). """
+    wanted = defaultdict(set)
+    for geography in geographies:
+        for model, pk in geography.hierarchy_keys():
+            wanted[model].add(pk)
+    # The parents are only used for their titles, so their geometries are left behind.
+    found = {model: model.objects.defer('geom', 'geom_medium', 'geom_low').in_bulk(list(pks))
+             for model, pks in wanted.items()}
+    for geography in geographies:
+        geography.__dict__['hierarchy'] = [found[model][pk] for model, pk in geography.hierarchy_keys()
+                                           if pk in found[model]]
+    return geographies
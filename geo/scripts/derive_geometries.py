@@ -0,0 +1,39 @@
+from django.db import connection
+
+from geo import models
+
+# Simplification tolerances in degrees (the geometries are in EPSG:4326). 0.0001
+# degrees is about 10 meters and 0.001 degrees is about 100 meters around here.
+SIMPLIFICATION_TOLERANCES = {
+    'geom_medium': 0.0001,
+    'geom_low': 0.001,
+}
+
+
+def run(geography_ids=None, geography_models=None):
+    """ Fills in the simplified geometries (geom_medium, geom_low) and the extent for all
+        geographies (or just the ones with the given ids, or of the given Geography
+        subclasses) with one UPDATE statement. """
+    assignments = ', '.join(
+        [f'{field} = ST_Multi(ST_SimplifyPreserveTopology(geom, {tolerance}))'
+         for field, tolerance in SIMPLIFICATION_TOLERANCES.items()] +
+        ['extent = ARRAY[ST_XMin(geom), ST_YMin(geom), ST_XMax(geom), ST_YMax(geom)]']
+    )
+    sql = f'UPDATE {models.Geography._meta.db_table} SET {assignments}'
+    conditions, params = [], []
+    if geography_ids is not None:
+        conditions.append('id = ANY(%s)')
+        params.append(list(geography_ids))
+    if geography_models is not None:
+        # Census geographies have their own (geoid) primary keys, so the rows are matched
+        # through the parent link instead. For census geographies that link points at
+        # CensusGeography, whose primary key is in turn the Geography id.
+        conditions.append('(' + ' OR '.join(
+            [f'id IN (SELECT {model._meta.get_ancestor_link(models.Geography).column} FROM {model._meta.db_table})'
+             for model in geography_models]
+            or ['FALSE']) + ')')
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        print(f'...derived geometries for {cursor.rowcount} geographies')
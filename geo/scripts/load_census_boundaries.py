@@ -1,6 +1,11 @@
+import multiprocessing
 import os
+
 from django.contrib.gis.utils import LayerMapping
+from django.db import connections, transaction
 from geo import models
+from geo.scripts import derive_geometries
+from geo.signals import geographies_loaded
 
 DATA_DIR = os.path.join(
     os.path.dirname(os.path.abspath(__file__)),
@@ -155,28 +160,63 @@ mappings = {
 }
 
 
-def run(ignore=[], only=[], clear_first=True):
-    for name, mapping in mappings.items():
-        print(name)
-        if name in ignore:
-            print("--ignored")
-            continue
-
-        if only and name not in only:
-            print("--skipped")
-            continue
-
+def load_layer(name, clear_first=True, step=1000):
+    """ Loads one layer in a single transaction, so that the old rows are replaced
+        atomically (readers see either the old or the new geographies, never an
+        empty or partially loaded table) and a failed load leaves the old rows in place. """
+    mapping = mappings[name]
+    with transaction.atomic():
         if clear_first:
-            print('...truncating table')
+            print(f'{name}: ...replacing existing rows')
             mapping['model'].objects.all().delete()
 
         lm = LayerMapping(
             mapping['model'],
             os.path.join(DATA_DIR, name, mapping['file_name'] + '.shp'),
-            mapping['mapping']
+            mapping['mapping'],
+            transaction_mode='commit_on_success',  # (one savepoint per step inside the outer transaction)
         )
-        try:
-            l = lm.save(verbose=True, strict=True)
-        except Exception as e:
-            print(e)
-            print(lm)
+        lm.save(verbose=False, strict=True, step=step)
+    print(f'{name}: loaded {mapping["model"].objects.count()} geographies')
+    return name
+
+
+def _load_layer_in_subprocess(args):
+    # Database connections can't be shared with the parent process, so each
+    # worker opens its own.
+    connections.close_all()
+    name, clear_first, step = args
+    try:
+        return load_layer(name, clear_first, step)
+    except Exception as e:
+        print(f'{name}: FAILED ({e}); the existing rows were kept')
+        return None
+
+
+def run(ignore=[], only=[], clear_first=True, step=1000, processes=1):
+    names = []
+    for name in mappings:
+        if name in ignore:
+            print(f'{name}: --ignored')
+            continue
+
+        if only and name not in only:
+            print(f'{name}: --skipped')
+            continue
+        names.append(name)
+
+    jobs = [(name, clear_first, step) for name in names]
+    if processes > 1:
+        # The layers are independent, so they can be loaded in parallel.
+        connections.close_all()
+        with multiprocessing.Pool(processes) as pool:
+            loaded = pool.map(_load_layer_in_subprocess, jobs)
+    else:
+        loaded = [_load_layer_in_subprocess(job) for job in jobs]
+    loaded = [name for name in loaded if name is not None]
+
+    if loaded:
+        print('deriving simplified geometries and extents')
+        derive_geometries.run(geography_models=[mappings[name]['model'] for name in loaded])
+        geographies_loaded.send(sender=run, levels=loaded)
+    return loaded
@@ -1,15 +1,69 @@
+from rest_framework import serializers
 from rest_framework_gis.serializers import (
     GeoFeatureModelSerializer,
+    GeoFeatureModelListSerializer,
     GeometrySerializerMethodField,
 )
-from geo.models import Geography
+from geo.models import Geography, resolve_hierarchies
+from geo.utils import resolution_from_params
 
 
 class GeographySerializer(GeoFeatureModelSerializer):
+    """ Geography as a GeoJSON feature. The geometry is simplified according to the
+        `resolution` (or `zoom`) query parameter, or a `resolution` passed in the context. """
+    geometry = GeometrySerializerMethodField()
+
+    def get_geometry(self, obj):
+        return obj.geometry_at(self.resolution)
+
+    @property
+    def resolution(self):
+        if 'resolution' not in self.context:
+            request = self.context.get('request')
+            self.context['resolution'] = resolution_from_params(request.query_params) if request else 'high'
+        return self.context['resolution']
+
+    class Meta:
+        model = Geography
+        geo_field = 'geometry'
+        fields = [
+            'name',
+            'description',
+        ]
+
+
+class GeographyListSerializer(GeoFeatureModelListSerializer):
+    """ Resolves the hierarchies of all the geographies being serialized at once. """
+
+    def to_representation(self, data):
+        geographies = resolve_hierarchies(list(data.all() if hasattr(data, 'all') else data))
+        return super().to_representation(geographies)
+
+
+class GeographyDetailSerializer(GeographySerializer):
+    """ Geography with its title, parent geographies, and bounding box (for the geo API). """
+    key = serializers.SerializerMethodField()
+    title = serializers.ReadOnlyField()
+    subtitle = serializers.ReadOnlyField()
+    bbox = serializers.ReadOnlyField()
+    hierarchy = serializers.SerializerMethodField()
+
+    def get_key(self, obj):
+        return obj.pk
+
+    def get_hierarchy(self, obj):
+        return [{'key': parent.pk, 'title': parent.title} for parent in obj.hierarchy]
+
     class Meta:
         model = Geography
-        geo_field = 'geom'
+        geo_field = 'geometry'
+        list_serializer_class = GeographyListSerializer
         fields = [
+            'key',
             'name',
             'description',
+            'title',
+            'subtitle',
+            'bbox',
+            'hierarchy',
         ]
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after geography layers have been (re)loaded, with `levels` being the list of
+# the names of the loaded layers (keys of geo.scripts.load_census_boundaries.mappings).
+geographies_loaded = Signal()
@@ -1,3 +1,72 @@
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from geo.models import Neighborhood, Tract
+from geo.scripts import derive_geometries
+from geo.utils import resolution_from_params
+
+
+def add_neighborhood(i):
+    x, y = -80 + i * 0.01, 40.4
+    Neighborhood.objects.create(name=f'Hood {i}', geom=MultiPolygon(
+        Polygon(((x, y), (x, y + 0.01), (x + 0.01, y + 0.01), (x + 0.01, y), (x, y)))))
+
+
+class GeometryResolutionTestCase(TestCase):
+    def test_resolution_from_params(self):
+        self.assertEqual(resolution_from_params({}), 'high')
+        self.assertEqual(resolution_from_params({'resolution': 'medium', 'zoom': '5'}), 'medium')
+        self.assertEqual(resolution_from_params({'zoom': '10.5'}), 'low')
+        self.assertEqual(resolution_from_params({'zoom': '13'}), 'medium')
+        self.assertEqual(resolution_from_params({'zoom': 'far'}, default='low'), 'low')
+
+    def test_underived_geometries_fall_back_to_finer_ones(self):
+        add_neighborhood(0)
+        neighborhood = Neighborhood.objects.get()
+        self.assertEqual(neighborhood.geometry_at('low'), neighborhood.geom)
+        derive_geometries.run()
+        neighborhood.refresh_from_db()
+        self.assertEqual(neighborhood.geometry_at('low'), neighborhood.geom_low)
+        self.assertEqual(neighborhood.geometry_at('medium'), neighborhood.geom_medium)
+        self.assertEqual(neighborhood.geometry_at('high'), neighborhood.geom)
+
+
+class GeographyViewSetTestCase(TestCase):
+    def setUp(self):
+        for i in range(3):
+            add_neighborhood(i)
+
+    def count_queries(self, resolution='low'):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/dev/geo/neighborhood/', {'resolution': resolution})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']['features']), Neighborhood.objects.count())
+        return len(context.captured_queries)
+
+    def test_underived_geometries_cost_no_extra_queries(self):
+        before = self.count_queries()
+        add_neighborhood(3)
+        self.assertEqual(self.count_queries(), before)
+
+    def test_derived_geometries_cost_no_extra_queries(self):
+        derive_geometries.run()
+        before = self.count_queries()
+        add_neighborhood(3)
+        derive_geometries.run()
+        self.assertEqual(self.count_queries(), before)
+        self.assertEqual(self.count_queries('medium'), before)
+
+
+class DeriveGeometriesTestCase(TestCase):
+    def test_only_the_given_levels_are_derived(self):
+        add_neighborhood(0)
+        Tract.objects.create(name='Tract 0301', geom=Neighborhood.objects.get().geom, geoid='42003030100',
+                             statefp='42', countyfp='003', tractce='030100', affgeoid='1400000US42003030100',
+                             lsad='CT', aland=1000, awater=0)
+        derive_geometries.run(geography_models=[Tract])
+        self.assertFalse(Tract.objects.filter(extent__isnull=True).exists())
+        self.assertFalse(Neighborhood.objects.filter(extent__isnull=False).exists())
+        derive_geometries.run(geography_models=[Tract, Neighborhood])
+        self.assertFalse(Neighborhood.objects.filter(extent__isnull=True).exists())
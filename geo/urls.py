@@ -0,0 +1,23 @@
+from rest_framework import routers
+
+from geo.views import NeighborhoodViewSet, TractViewSet, BlockGroupViewSet, CountyViewSet, \
+    CountySubdivisionViewSet, PlaceViewSet, PumaViewSet, SchoolDistrictViewSet, StateHouseViewSet, \
+    StateSenateViewSet
+
+# register DRF Views and ViewSets
+router = routers.DefaultRouter()
+router.register(r'neighborhood', NeighborhoodViewSet)
+router.register(r'tract', TractViewSet)
+router.register(r'block-group', BlockGroupViewSet)
+router.register(r'county', CountyViewSet)
+router.register(r'county-subdivision', CountySubdivisionViewSet)
+router.register(r'place', PlaceViewSet)
+router.register(r'puma', PumaViewSet)
+router.register(r'school-district', SchoolDistrictViewSet)
+router.register(r'state-house', StateHouseViewSet)
+router.register(r'state-senate', StateSenateViewSet)
+
+urlpatterns = []
+
+# appends registered API urls to `urlpatterns`
+urlpatterns += router.urls
@@ -9,3 +9,23 @@ def clean_sql(sql_str: str, regex: Pattern = r'[\n\r\t\s]+', repl: str = ' ') ->
          look into replacing this or finding a better way to make SQL readable without all the waste
     """
     return re.sub(regex, repl, sql_str).strip()
+
+
+RESOLUTIONS = ('low', 'medium', 'high')
+
+
+def resolution_from_params(params, default: str = 'high') -> str:
+    """ Picks a geometry resolution from request query params, either given directly
+        (`resolution=low|medium|high`) or derived from a web-map zoom level (`zoom=11`). """
+    resolution = params.get('resolution')
+    if resolution in RESOLUTIONS:
+        return resolution
+    try:
+        zoom = float(params.get('zoom'))
+    except (TypeError, ValueError):
+        return default
+    if zoom < 11:
+        return 'low'
+    if zoom < 14:
+        return 'medium'
+    return 'high'
@@ -1,3 +1,73 @@
-from django.shortcuts import render
+from rest_framework import viewsets, filters
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework_gis.filters import InBBoxFilter
 
-# TODO: Create your views here.
+from geo.models import Neighborhood, Tract, BlockGroup, County, CountySubdivision, Place, Puma, \
+    SchoolDistrict, StateHouse, StateSenate
+from geo.serializers import GeographyDetailSerializer
+from geo.utils import resolution_from_params
+
+GEOMETRY_FIELDS = {'low': 'geom_low', 'medium': 'geom_medium', 'high': 'geom'}
+
+
+class GeographyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only geographies as GeoJSON features. Geometries are simplified according to
+    `resolution=low|medium|high` (or `zoom=<web map zoom level>`).
+    """
+    serializer_class = GeographyDetailSerializer
+    pagination_class = LimitOffsetPagination
+    filter_backends = [filters.SearchFilter, InBBoxFilter]
+    bbox_filter_field = 'geom'
+    bbox_filter_include_overlapping = True
+    search_fields = ['name']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Only load the geometry column that is going to be returned, once derive_geometries
+        # has filled in the simplified geometries and extents (until then, geometry_at and
+        # bbox fall back to geom, which would otherwise cost a query per geography).
+        if queryset.filter(extent__isnull=True).exists():
+            return queryset
+        wanted = GEOMETRY_FIELDS[resolution_from_params(self.request.query_params)]
+        return queryset.defer(*[field for field in GEOMETRY_FIELDS.values() if field != wanted])
+
+
+class NeighborhoodViewSet(GeographyViewSet):
+    queryset = Neighborhood.objects.all()
+
+
+class TractViewSet(GeographyViewSet):
+    queryset = Tract.objects.all()
+
+
+class BlockGroupViewSet(GeographyViewSet):
+    queryset = BlockGroup.objects.all()
+
+
+class CountyViewSet(GeographyViewSet):
+    queryset = County.objects.all()
+
+
+class CountySubdivisionViewSet(GeographyViewSet):
+    queryset = CountySubdivision.objects.all()
+
+
+class PlaceViewSet(GeographyViewSet):
+    queryset = Place.objects.all()
+
+
+class PumaViewSet(GeographyViewSet):
+    queryset = Puma.objects.all()
+
+
+class SchoolDistrictViewSet(GeographyViewSet):
+    queryset = SchoolDistrict.objects.all()
+
+
+class StateHouseViewSet(GeographyViewSet):
+    queryset = StateHouse.objects.all()
+
+
+class StateSenateViewSet(GeographyViewSet):
+    queryset = StateSenate.objects.all()